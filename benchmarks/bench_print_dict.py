@@ -0,0 +1,78 @@
+"""Compare the json renderer with the previous pygments based print_dict.
+
+Run with `python -m benchmarks.bench_print_dict`. Results are printed as
+json.
+"""
+import json
+import sys
+
+from benchmarks.harness import timed
+from pttui.json_printer import JsonRenderer
+
+
+def legacy_print_dict(data):
+    """The print_dict implementation before JsonRenderer, minus printing."""
+    from pygments.lexers.data import JsonLexer
+    from pygments.token import Token
+
+    text = json.dumps(data, indent=4)
+
+    lex = JsonLexer()
+    tokens = lex.get_tokens(text)
+    out = []
+    for tok in tokens:
+        if tok[0] == Token.Text:
+            out.append(tok[1])
+        elif tok[0] == Token.Punctuation:
+            out.append(tok[1])
+        elif tok[0] == Token.Name.Tag:
+            out.append("<green>{}</green>".format(tok[1]))
+        elif tok[0] == Token.Literal.Number.Integer:
+            out.append("<orange>{}</orange>".format(tok[1]))
+        elif tok[0] == Token.Keyword.Constant:
+            out.append("<red>{}</red>".format(tok[1]))
+        elif tok[0] == Token.Literal.Number.Float:
+            out.append("<yellow>{}</yellow>".format(tok[1]))
+        else:
+            out.append(tok[1])
+    return "\n{}".format("".join(out))
+
+
+def make_payload(records):
+    return {
+        "records": [
+            {
+                "id": idx,
+                "name": "device {}".format(idx),
+                "enabled": idx % 2 == 0,
+                "position": {"x": idx * 1.5, "y": None},
+                "tags": ["a", "b", "c"],
+            }
+            for idx in range(records)
+        ]
+    }
+
+
+def run(sizes=(100, 1000, 10000)):
+    results = []
+    for records in sizes:
+        data = make_payload(records)
+        result = {
+            "records": records,
+            "payload_bytes": len(json.dumps(data)),
+            "renderer_s": timed(JsonRenderer().fragments, data),
+            "renderer_collapsed_s": timed(
+                JsonRenderer(max_depth=2, max_items=100).fragments, data
+            ),
+        }
+        try:
+            result["legacy_s"] = timed(legacy_print_dict, data)
+        except ImportError:
+            result["legacy_s"] = None
+        results.append(result)
+    return results
+
+
+if __name__ == "__main__":
+    json.dump({"print_dict": run()}, sys.stdout, indent=4)
+    sys.stdout.write("\n")
@@ -0,0 +1,81 @@
+"""Benchmark startup and key handling latency on the asyncio event loop.
+
+Startup is the time from creating the Application to its first frame.
+Key latency is measured end to end: from writing a key to the input pipe
+until its handler runs, and until the next frame is rendered. When uvloop
+is installed the same measurements are done on a uvloop event loop.
+
+Run with `python -m benchmarks.bench_startup`. Results are printed as
+json.
+"""
+import asyncio
+import json
+import sys
+import time
+
+from benchmarks.harness import headless_app, summary
+
+PRESSES = 200
+
+
+async def measure(presses=PRESSES):
+    from pttui.command_sidebar import SideBar, SideBarItemButton
+
+    handled = []
+
+    async def handler(*args):
+        handled[-1].set_result(time.perf_counter())
+
+    root = SideBar(None, [SideBarItemButton("key", handler, "k")], None)
+    start = time.perf_counter()
+    async with headless_app(root) as app:
+        startup = time.perf_counter() - start
+
+        to_handler = []
+        to_render = []
+        for _ in range(presses):
+            loop = asyncio.get_running_loop()
+            handled.append(loop.create_future())
+            rendered = loop.create_future()
+
+            def after_render(sender, rendered=rendered):
+                if not rendered.done():
+                    rendered.set_result(time.perf_counter())
+
+            app.after_render += after_render
+            sent = time.perf_counter()
+            app.input.send_text("k")
+            to_handler.append(await handled[-1] - sent)
+            to_render.append(await rendered - sent)
+            app.after_render -= after_render
+
+    return {
+        "loop": type(asyncio.get_running_loop()).__module__,
+        "startup_s": startup,
+        "key_to_handler": summary(to_handler),
+        "key_to_render": summary(to_render),
+    }
+
+
+def _run_on(new_loop, presses):
+    loop = new_loop()
+    try:
+        return loop.run_until_complete(measure(presses))
+    finally:
+        loop.close()
+
+
+def run(presses=PRESSES):
+    results = [_run_on(asyncio.new_event_loop, presses)]
+    try:
+        import uvloop
+    except ImportError:
+        pass
+    else:
+        results.append(_run_on(uvloop.new_event_loop, presses))
+    return results
+
+
+if __name__ == "__main__":
+    json.dump(run(), sys.stdout, indent=4)
+    sys.stdout.write("\n")
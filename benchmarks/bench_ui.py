@@ -0,0 +1,222 @@
+"""Benchmark the pttui user interface, headless.
+
+Measures print throughput against the size of the output buffer,
+print_dict latency against the payload size, redraw time, sidebar build
+time and key navigation latency.
+
+Run with `python -m benchmarks.bench_ui`. Results are printed as json.
+"""
+import asyncio
+import json
+import sys
+import time
+
+from prompt_toolkit.application.current import set_app
+from prompt_toolkit.keys import Keys
+
+from benchmarks.bench_print_dict import make_payload
+from benchmarks.harness import headless_app, press, render, summary, timed
+
+SIZES = {
+    "buffer_lines": (0, 10000, 100000, 1000000),
+    "print_lines": 20000,
+    "payload_records": (100, 1000, 10000),
+    "redraws": 20,
+    "sidebar_items": (10, 100, 1000),
+    "list_items": (1000, 100000, 1000000),
+    "key_presses": 200,
+}
+
+QUICK_SIZES = {
+    "buffer_lines": (0, 10000),
+    "print_lines": 2000,
+    "payload_records": (100, 1000),
+    "redraws": 5,
+    "sidebar_items": (10, 100),
+    "list_items": (1000, 10000),
+    "key_presses": 20,
+}
+
+
+async def _nothing(*args):
+    pass
+
+
+def _fill(output, lines):
+    output.clear()
+    if lines:
+        output.append(
+            "\n".join("filler line {}".format(idx) for idx in range(lines))
+        )
+
+
+def bench_print_throughput(app, sizes):
+    from pttui import layout, printers
+
+    output = layout.output
+    count = sizes["print_lines"]
+    results = []
+    output.set_scrollback(None)
+    try:
+        for buffer_lines in sizes["buffer_lines"]:
+            _fill(output, buffer_lines)
+            start = time.perf_counter()
+            for idx in range(count):
+                printers.print_line("printed line {}".format(idx))
+            printers.flush()
+            render(app)
+            duration = time.perf_counter() - start
+            results.append(
+                {
+                    "buffer_lines": buffer_lines,
+                    "lines": count,
+                    "seconds": duration,
+                    "lines_per_s": count / duration,
+                }
+            )
+    finally:
+        output.set_scrollback(layout.SCROLLBACK_LINES)
+        output.clear()
+    return results
+
+
+def bench_print_dict(app, sizes):
+    from pttui import layout, printers
+
+    def print_dict(data):
+        layout.output.clear()
+        printers.print_dict(data)
+        printers.flush()
+
+    results = []
+    for records in sizes["payload_records"]:
+        data = make_payload(records)
+        results.append(
+            {
+                "records": records,
+                "payload_bytes": len(json.dumps(data)),
+                "seconds": timed(print_dict, data),
+            }
+        )
+    layout.output.clear()
+    return results
+
+
+def bench_redraw(app, sizes):
+    from pttui import layout
+
+    results = []
+    for buffer_lines in sizes["buffer_lines"]:
+        _fill(layout.output, min(buffer_lines, layout.SCROLLBACK_LINES))
+        layout.output.scroll_to_end()
+        for full in (True, False):
+            durations = []
+            for _ in range(sizes["redraws"]):
+                start = time.perf_counter()
+                render(app, full=full)
+                durations.append(time.perf_counter() - start)
+            result = summary(durations)
+            result["buffer_lines"] = layout.output.line_count
+            result["full"] = full
+            results.append(result)
+    layout.output.clear()
+    return results
+
+
+def bench_sidebar_build(app, sizes):
+    from pttui.command_sidebar import (
+        SideBar,
+        SideBarItemButton,
+        SideBarSelectableList,
+    )
+
+    results = []
+    for count in sizes["sidebar_items"]:
+
+        def build():
+            items = [
+                SideBarItemButton("item {}".format(idx), _nothing)
+                for idx in range(count)
+            ]
+            return SideBar(None, items, None, title="bench")
+
+        results.append(
+            {"kind": "buttons", "items": count, "seconds": timed(build)}
+        )
+    for count in sizes["list_items"]:
+        items = [{"text": "item {}".format(idx)} for idx in range(count)]
+        results.append(
+            {
+                "kind": "selectable_list",
+                "items": count,
+                "seconds": timed(SideBarSelectableList, None, items, None),
+            }
+        )
+    return results
+
+
+def _navigate(app, sizes):
+    durations = []
+    for idx in range(sizes["key_presses"]):
+        key = Keys.Down if idx % 50 < 25 else Keys.Up
+        start = time.perf_counter()
+        press(app, key)
+        durations.append(time.perf_counter() - start)
+    return summary(durations)
+
+
+def bench_key_navigation(app, sizes, root):
+    from pttui.command_sidebar import (
+        SideBar,
+        SideBarItemButton,
+        SideBarSelectableList,
+    )
+
+    results = []
+    for count in sizes["sidebar_items"]:
+        items = [
+            SideBarItemButton("item {}".format(idx), _nothing)
+            for idx in range(count)
+        ]
+        SideBar(None, items, None, title="bench").show()
+        render(app)
+        result = _navigate(app, sizes)
+        result.update(kind="buttons", items=count)
+        results.append(result)
+    for count in sizes["list_items"]:
+        items = [{"text": "item {}".format(idx)} for idx in range(count)]
+        SideBarSelectableList(None, items, None).show()
+        render(app)
+        result = _navigate(app, sizes)
+        result.update(kind="selectable_list", items=count)
+        results.append(result)
+    root.show()
+    return results
+
+
+async def run_async(sizes=SIZES):
+    from pttui import printers
+    from pttui.command_sidebar import SideBar, SideBarItemButton
+
+    root = SideBar(None, [SideBarItemButton("a", _nothing, "a")], None)
+    async with headless_app(root) as app:
+        with set_app(app):
+            results = {
+                "print_throughput": bench_print_throughput(app, sizes),
+                "print_dict": bench_print_dict(app, sizes),
+                "redraw": bench_redraw(app, sizes),
+                "sidebar_build": bench_sidebar_build(app, sizes),
+                "key_navigation": bench_key_navigation(app, sizes, root),
+            }
+        printers.flush()
+    return results
+
+
+def run(sizes=SIZES):
+    return asyncio.run(run_async(sizes))
+
+
+if __name__ == "__main__":
+    sizes = QUICK_SIZES if "--quick" in sys.argv else SIZES
+    json.dump(run(sizes), sys.stdout, indent=4)
+    sys.stdout.write("\n")
@@ -0,0 +1,84 @@
+"""Run pttui headless, against a pipe input and a dummy output."""
+import asyncio
+import contextlib
+import statistics
+import time
+
+from prompt_toolkit.application import Application
+from prompt_toolkit.application.current import set_app
+from prompt_toolkit.input import create_pipe_input
+from prompt_toolkit.key_binding.key_processor import KeyPress
+from prompt_toolkit.output import DummyOutput
+
+
+def timed(func, *args, repeat=3):
+    """Return the best duration of repeat calls to func(*args)."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        duration = time.perf_counter() - start
+        if best is None or duration < best:
+            best = duration
+    return best
+
+
+def summary(durations):
+    """Summarize a list of durations in seconds."""
+    return {
+        "count": len(durations),
+        "min_s": min(durations),
+        "median_s": statistics.median(durations),
+        "max_s": max(durations),
+    }
+
+
+def render(app, full=False):
+    """Render the app. A full render repaints the whole screen."""
+    if full:
+        app.renderer.reset(leave_alternate_screen=False)
+    app.renderer.render(app, app.layout)
+
+
+def press(app, key, data=""):
+    """Handle a key press and render the result, like the running app."""
+    app.key_processor.feed(KeyPress(key, data))
+    app.key_processor.process_keys()
+    render(app)
+
+
+@contextlib.asynccontextmanager
+async def headless_app(entry_point):
+    """Run the pttui layout with entry_point as the sidebar.
+
+    Yields the running Application once it has rendered its first frame.
+    The benchmark code runs in another task than the application, wrap
+    code which uses `get_app` in `set_app(app)`.
+    """
+    from pttui import layout
+
+    with create_pipe_input() as pipe_input:
+        app = Application(
+            input=pipe_input,
+            output=DummyOutput(),
+            full_screen=True,
+            key_bindings=layout.kb,
+            style=layout.ui_style,
+        )
+        with set_app(app):
+            app.layout = layout.get_layout(entry_point, None)
+
+        first_render = asyncio.get_running_loop().create_future()
+
+        def rendered(sender):
+            app.after_render -= rendered
+            first_render.set_result(None)
+
+        app.after_render += rendered
+        task = asyncio.ensure_future(app.run_async())
+        await first_render
+        try:
+            yield app
+        finally:
+            app.exit()
+            await task
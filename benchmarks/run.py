@@ -0,0 +1,96 @@
+"""Run all benchmarks and write the results as json.
+
+    python -m benchmarks.run [--quick] [--output FILE] [--compare FILE]
+
+The results are tagged with the git commit and the versions involved.
+With --compare the results are compared with an earlier results file:
+for every measured duration the ratio new / old is reported, a ratio
+above 1 is a slowdown.
+"""
+import argparse
+import datetime
+import json
+import platform
+import subprocess
+import sys
+
+import prompt_toolkit
+
+from benchmarks import bench_print_dict, bench_startup, bench_ui
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"],
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(quick=False):
+    sizes = bench_ui.QUICK_SIZES if quick else bench_ui.SIZES
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "prompt_toolkit": prompt_toolkit.__version__,
+            "quick": quick,
+        },
+        "renderer": bench_print_dict.run(sizes["payload_records"]),
+        "ui": bench_ui.run(sizes),
+        "startup": bench_startup.run(sizes["key_presses"]),
+    }
+
+
+def _durations(results, path=()):
+    """Yield (path, seconds) for every duration in results."""
+    if isinstance(results, dict):
+        for key, value in results.items():
+            if key == "meta":
+                continue
+            if key.endswith("_s") or key == "seconds":
+                if isinstance(value, (int, float)):
+                    yield path + (key,), value
+            else:
+                yield from _durations(value, path + (key,))
+    elif isinstance(results, list):
+        for idx, value in enumerate(results):
+            yield from _durations(value, path + (str(idx),))
+
+
+def compare(old, new):
+    """Return the ratio new / old of every duration found in both."""
+    old_durations = dict(_durations(old))
+    ratios = {}
+    for path, seconds in _durations(new):
+        previous = old_durations.get(path)
+        if previous:
+            ratios["/".join(path)] = seconds / previous
+    return ratios
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="small sizes")
+    parser.add_argument("--output", help="write the results to this file")
+    parser.add_argument("--compare", help="results file to compare with")
+    args = parser.parse_args(argv)
+
+    results = run(args.quick)
+    if args.compare:
+        with open(args.compare) as fle:
+            results["compare"] = compare(json.load(fle), results)
+    if args.output:
+        with open(args.output, "w") as fle:
+            json.dump(results, fle, indent=4)
+    else:
+        json.dump(results, sys.stdout, indent=4)
+        sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@ import asyncio
 import logging
 
 from prompt_toolkit import Application
-from prompt_toolkit.eventloop import use_asyncio_event_loop
+from prompt_toolkit.application.current import set_app
 from prompt_toolkit.layout import Layout
 from prompt_toolkit.styles import Style
 from prompt_toolkit.widgets import MenuContainer, MenuItem
@@ -16,31 +16,61 @@ from pttui.command_sidebar import (
     SideBarForm,
     SideBarItemTextEntry,
     SideBarItemSpace,
+    SideBarItemExecutorButton,
+    SideBarItemStreamButton,
 )
+from pttui.animation import ticker
+from pttui.async_widgets import PROCESS
 from pttui.printers import (
     print_line,
     print_key_value_pair,
     print_dict,
-    LogHandler,
+    QueueLogHandler,
     spinner,
 )
-from pttui.helpers import Context
-
-from pttui.layout import set_status, get_layout, output
+from pttui.helpers import Context, use_uvloop
+from pttui.stream_printer import stream
+
+from pttui.layout import (
+    set_status,
+    get_layout,
+    output,
+    sidebar_cache,
+    channels,
+)
 
 from pttui.layout import kb, ui_style
 
-use_asyncio_event_loop()
-
 logger = logging.getLogger()
 logger.setLevel(logging.DEBUG)
+# log records get their own tab (ctrl-pageup/pagedown to switch tabs).
+channels.add("log", max_lines=5000)
+channels.add_route("log")
 #
-_handler = LogHandler()
+_handler = QueueLogHandler()
 logger.addHandler(_handler)
 # #
 LOGGER = logging.getLogger(__name__)
 
 
+def count_primes(limit):
+    """A cpu heavy function, run in a process pool from the menu."""
+    primes = 0
+    for number in range(2, limit):
+        if all(number % div for div in range(2, int(number ** 0.5) + 1)):
+            primes += 1
+    return {"limit": limit, "primes": primes}
+
+
+async def device_events():
+    """An endless async generator, streamed to the output from the menu."""
+    number = 0
+    while True:
+        number += 1
+        yield "event {}".format(number)
+        await asyncio.sleep(0.2)
+
+
 class SceneMenu(SideBar):
     def __init__(self, context, parent_container=None):
         items = [
@@ -75,6 +105,22 @@ class ShadeMenu(SideBar):
         items.append(SideBarItemButton("test menu", self.test_menu, "t"))
         items.append(SideBarItemButton("add scene", self.add_scene, "a"))
         items.append(SideBarItemButton("select text",self.select_text,"x"))
+        items.append(
+            SideBarItemExecutorButton(
+                "count primes",
+                count_primes,
+                "h",
+                args=(500000,),
+                executor=PROCESS,
+            )
+        )
+        items.append(
+            SideBarItemStreamButton(
+                "stream events",
+                lambda: stream(device_events(), lines=True),
+                "e",
+            )
+        )
         super().__init__(context, items, parent_container, "SHADE MENU")
 
     @spinner("Adding item")
@@ -83,9 +129,9 @@ class ShadeMenu(SideBar):
         await asyncio.sleep(3)
 
     async def select_text(self,*args):
-        output.cursor_position=0
+        output.move_cursor(0)
         output.start_selection()
-        output.cursor_position=100
+        output.move_cursor(100)
 
     async def test_menu(self, *args):
         test = SideBar(None, [SideBarItemSpace()], None)
@@ -114,32 +160,40 @@ class ShadeMenu(SideBar):
     async def start_timer(self, *args):
         print_line("starting timer")
         loop = 0
-        while loop < 30:
-            loop += 1
-            set_status(
-                "loop", "<green>loop:</green><orange>{}</orange>".format(loop)
-            )
-            await asyncio.sleep(1)
-            print_line("looping")
+        with ticker.progress("timer", 30) as progress:
+            while loop < 30:
+                loop += 1
+                set_status(
+                    "loop",
+                    "<green>loop:</green><orange>{}</orange>".format(loop),
+                )
+                progress.advance()
+                await asyncio.sleep(1)
+                print_line("looping")
         print_line("finished")
 
     async def delete(self, *args):
-        yes_no = SideBarYesNo(
-            None, self, label="Are you sure ?", title="DELETE"
+        # dialogs are built once and reset every time they are asked.
+        yes_no = sidebar_cache.get(
+            "delete",
+            lambda: SideBarYesNo(
+                None, self, label="Are you sure ?", title="DELETE"
+            ),
         )
-        yes_no.show()
         # await the result to be sure to return to this method and proceed
         # depending on the result.
-        result = await yes_no.future
+        result = await yes_no.ask()
         print_key_value_pair("return value: ", result)
 
     async def get_list(self, *args):
         items = [{"text": "item 1"}, {"text": "item 2"}, {"text": "item 3"}]
-        select_items = SideBarSelectableList(
-            None, items, self, title="Select an item."
+        select_items = sidebar_cache.get(
+            "get_list",
+            lambda: SideBarSelectableList(
+                None, items, self, title="Select an item.", filterable=True
+            ),
         )
-        select_items.show()
-        selected = await select_items.future
+        selected = await select_items.ask()
 
         print_key_value_pair("selected item: ", selected)
 
@@ -147,9 +201,8 @@ class ShadeMenu(SideBar):
         print_key_value_pair("info", "here")
 
     async def user(self, *args):
-        user = UserInput(self)
-        user.show()
-        data = await user.future
+        user = sidebar_cache.get("user", lambda: UserInput(self))
+        data = await user.ask()
         print_key_value_pair("input", data)
 
 
@@ -163,8 +216,6 @@ class UserInput(SideBarForm):
         super().__init__(None, items, parent_container, title="Enter hub data")
 
 
-loop = asyncio.get_event_loop()
-
 context = Context()
 
 shade_menu = ShadeMenu(context)
@@ -185,13 +236,14 @@ menu_items = [
     )
 ]
 
-layout = get_layout(shade_menu, menu_items)
 
-app = Application(
-    layout=layout,
-    full_screen=True,
-    key_bindings=kb,
-    style=ui_style,
-)
+async def main():
+    app = Application(full_screen=True, key_bindings=kb, style=ui_style)
+    with set_app(app):
+        app.layout = get_layout(shade_menu, menu_items)
+    await app.run_async()
+
 
-loop.run_until_complete(app.run_async().to_asyncio_future())
+if __name__ == "__main__":
+    use_uvloop()
+    asyncio.run(main())
@@ -0,0 +1,134 @@
+from pttui.helpers import running_loop
+from pttui.layout import status
+
+SPINNER_FRAMES = "|/-\\"
+PROGRESS_WIDTH = 10
+
+
+class Indicator:
+    """An animated indicator shown in the status bar.
+
+    Use it as a context manager (or call start and stop) to be sure it is
+    removed again.
+    """
+
+    def __init__(self, ticker, message):
+        self.ticker = ticker
+        self.message = message
+        self.name = "indicator-{}".format(id(self))
+
+    def render(self, frame):
+        """Return the fragments for frame or None when nothing changed."""
+        raise NotImplementedError()
+
+    def start(self):
+        self.ticker.add(self)
+        return self
+
+    def stop(self):
+        self.ticker.remove(self)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class Spinner(Indicator):
+    def render(self, frame):
+        return [
+            ("class:spinner", SPINNER_FRAMES[frame % len(SPINNER_FRAMES)]),
+            ("", " " + self.message),
+        ]
+
+
+class Progress(Indicator):
+    """A progress bar for a known amount of work."""
+
+    def __init__(self, ticker, message, total):
+        super().__init__(ticker, message)
+        self.total = total
+        self.done = 0
+        self._dirty = True
+
+    def update(self, done):
+        self.done = min(done, self.total)
+        # rendered on the next tick, so many updates per frame are cheap.
+        self._dirty = True
+
+    def advance(self, count=1):
+        self.update(self.done + count)
+
+    def render(self, frame):
+        if not self._dirty:
+            return None
+        self._dirty = False
+        ratio = self.done / self.total if self.total else 1
+        filled = int(ratio * PROGRESS_WIDTH)
+        return [
+            ("", self.message + " "),
+            ("class:progress", "#" * filled),
+            ("", "." * (PROGRESS_WIDTH - filled)),
+            ("", " {:3d}%".format(int(ratio * 100))),
+        ]
+
+
+class Ticker:
+    """Animates all active indicators from a single timer.
+
+    Every tick renders the active indicators into their status bar segment,
+    so a tick costs O(active indicators). The timer only runs while there
+    are active indicators.
+
+    :param status: The StatusBar to show the indicators in.
+    :param interval: Seconds between frames.
+    """
+
+    def __init__(self, status, interval=0.1):
+        self.status = status
+        self.interval = interval
+        self._indicators = {}
+        self._frame = 0
+        self._handle = None
+
+    @property
+    def active(self):
+        return len(self._indicators)
+
+    def spinner(self, message):
+        return Spinner(self, message)
+
+    def progress(self, message, total):
+        return Progress(self, message, total)
+
+    def add(self, indicator):
+        self._indicators[indicator.name] = indicator
+        self.status.set(indicator.name, indicator.render(self._frame))
+        if self._handle is None:
+            self._schedule()
+
+    def remove(self, indicator):
+        if self._indicators.pop(indicator.name, None) is not None:
+            self.status.remove(indicator.name)
+        if not self._indicators and self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def _schedule(self):
+        loop = running_loop()
+        if loop is not None:
+            self._handle = loop.call_later(self.interval, self._tick)
+
+    def _tick(self):
+        self._handle = None
+        self._frame += 1
+        for indicator in list(self._indicators.values()):
+            fragments = indicator.render(self._frame)
+            if fragments is not None:
+                self.status.set(indicator.name, fragments)
+        if self._indicators:
+            self._schedule()
+
+
+ticker = Ticker(status)
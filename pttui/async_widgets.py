@@ -1,20 +1,291 @@
 import asyncio
+import logging
+import sys
+from collections import deque
+from concurrent.futures import (
+    Executor,
+    ThreadPoolExecutor,
+    ProcessPoolExecutor,
+)
+from functools import partial
+from weakref import WeakKeyDictionary
 
 from prompt_toolkit.application import get_app
 from prompt_toolkit.key_binding import KeyBindings
 from prompt_toolkit.layout import FormattedTextControl, Window, WindowAlign
 from prompt_toolkit.mouse_events import MouseEventType
 
+LOGGER = logging.getLogger(__name__)
+
+# What to do when a handler is triggered while it is already running
+# `limit` times.
+DROP = "drop"  # ignore the new trigger.
+QUEUE = "queue"  # run it when a running one finishes.
+CANCEL_PREVIOUS = "cancel_previous"  # cancel the running ones.
+DEBOUNCE = "debounce"  # only run after `delay` seconds without triggers.
+TOGGLE = "toggle"  # cancel the running ones instead of starting a new one.
+
+THREAD = "thread"
+PROCESS = "process"
+
+_executors = {}
+
+
+def get_executor(kind=THREAD):
+    """Return the shared thread or process pool, created on first use."""
+    try:
+        return _executors[kind]
+    except KeyError:
+        pass
+    if kind == THREAD:
+        executor = ThreadPoolExecutor()
+    elif kind == PROCESS:
+        executor = ProcessPoolExecutor()
+    else:
+        raise ValueError("Unknown executor {}".format(kind))
+    _executors[kind] = executor
+    return executor
+
+
+def run_in_executor(func, *args, executor=THREAD):
+    """Run the blocking func(*args) in a pool and return an awaitable.
+
+    executor is THREAD, PROCESS or a concurrent.futures.Executor. For a
+    process pool func and args must be picklable. Cancelling the awaitable
+    only stops a call which has not started yet, a running call continues
+    in the background and its result is discarded.
+    """
+    if not isinstance(executor, Executor):
+        executor = get_executor(executor)
+    return asyncio.get_running_loop().run_in_executor(
+        executor, partial(func, *args)
+    )
+
+
+def shutdown_executors():
+    """Shut the shared pools down without waiting for running calls.
+
+    Queued calls are cancelled (on Python 3.9 and later). A call which is
+    already running can not be stopped, the interpreter waits for running
+    process pool calls before it exits.
+    """
+    for executor in _executors.values():
+        if sys.version_info >= (3, 9):
+            executor.shutdown(wait=False, cancel_futures=True)
+        else:
+            executor.shutdown(wait=False)
+    _executors.clear()
+
+
+class HandlerStats:
+    """Run statistics of a handler."""
+
+    def __init__(self):
+        self.started = 0
+        self.finished = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.dropped = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.last_time = 0.0
+
+    @property
+    def mean_time(self):
+        done = self.finished + self.failed + self.cancelled
+        return self.total_time / done if done else 0.0
+
+
+class _HandlerState:
+    def __init__(self, policy=DROP, limit=1, delay=0.3):
+        self.policy = policy
+        self.limit = limit
+        self.delay = delay
+        self.running = set()
+        self.pending = deque()
+        self.timer = None
+
+    @property
+    def idle(self):
+        return not self.running and not self.pending and self.timer is None
+
+
+class TaskSupervisor:
+    """Runs and tracks the tasks started by buttons and key bindings.
+
+    Every handler has a concurrency limit and a policy which decides what
+    happens when it is triggered while `limit` instances are running. The
+    default is to run one instance and drop triggers while it runs.
+    Exceptions are logged (and passed to `on_error`) instead of getting
+    lost and run times are collected per handler in `stats`.
+
+    Policies and stats are kept as long as the handler exists, the run
+    state of a handler only while it has something running, queued or
+    debounced.
+    """
+
+    def __init__(self, on_error=None):
+        self.on_error = on_error
+        self._policies = WeakKeyDictionary()
+        self._states = {}
+        self._tasks = {}
+        self.stats = WeakKeyDictionary()
+
+    @staticmethod
+    def handler_name(handler):
+        return getattr(handler, "__qualname__", repr(handler))
+
+    def set_policy(self, handler, policy=DROP, limit=1, delay=0.3):
+        """Set the concurrency policy of a handler."""
+        assert policy in (DROP, QUEUE, CANCEL_PREVIOUS, DEBOUNCE, TOGGLE)
+        assert limit > 0
+        self._policies[handler] = (policy, limit, delay)
+        state = self._states.get(handler)
+        if state is not None:
+            state.policy = policy
+            state.limit = limit
+            state.delay = delay
+
+    def _state(self, handler):
+        try:
+            return self._states[handler]
+        except KeyError:
+            state = self._states[handler] = _HandlerState(
+                *self._policies.get(handler, ())
+            )
+            return state
+
+    def _release(self, handler):
+        """Forget the run state of a handler which is idle."""
+        state = self._states.get(handler)
+        if state is not None and state.idle:
+            del self._states[handler]
+
+    def _stats(self, handler):
+        try:
+            return self.stats[handler]
+        except KeyError:
+            stats = self.stats[handler] = HandlerStats()
+            return stats
+
+    @property
+    def in_flight(self):
+        """Running tasks mapped to (handler name, start time)."""
+        return dict(self._tasks)
+
+    def run(self, handler, *args, done_callback=None):
+        """Run the coroutine function handler with args as a task.
+
+        Returns the task, or None when it was dropped, queued or debounced.
+        """
+        state = self._state(handler)
+        if state.policy == DEBOUNCE:
+            if state.timer is not None:
+                state.timer.cancel()
+            state.timer = asyncio.get_running_loop().call_later(
+                state.delay, self._start, handler, args, done_callback
+            )
+            return None
+
+        if len(state.running) >= state.limit:
+            if state.policy == DROP:
+                self._stats(handler).dropped += 1
+                return None
+            if state.policy == QUEUE:
+                state.pending.append((args, done_callback))
+                return None
+            if state.policy == TOGGLE:
+                self.cancel(handler)
+                return None
+            for task in state.running:
+                task.cancel()
+            state.running.clear()
+        return self._start(handler, args, done_callback)
+
+    def _start(self, handler, args, done_callback):
+        state = self._state(handler)
+        state.timer = None
+        loop = asyncio.get_running_loop()
+        task = loop.create_task(handler(*args))
+        state.running.add(task)
+        self._tasks[task] = (self.handler_name(handler), loop.time())
+        self._stats(handler).started += 1
+        task.add_done_callback(partial(self._done, handler))
+        if done_callback:
+            task.add_done_callback(done_callback)
+        return task
+
+    def _done(self, handler, task):
+        state = self._state(handler)
+        state.running.discard(task)
+        name, start = self._tasks.pop(task)
+        stats = self._stats(handler)
+        duration = asyncio.get_running_loop().time() - start
+        stats.total_time += duration
+        stats.max_time = max(stats.max_time, duration)
+        stats.last_time = duration
+
+        if task.cancelled():
+            stats.cancelled += 1
+        elif task.exception() is not None:
+            stats.failed += 1
+            LOGGER.error(
+                "Handler %s failed", name, exc_info=task.exception()
+            )
+            if self.on_error:
+                self.on_error(handler, task.exception())
+        else:
+            stats.finished += 1
+
+        if state.pending and len(state.running) < state.limit:
+            args, done_callback = state.pending.popleft()
+            self._start(handler, args, done_callback)
+        self._release(handler)
+
+    def cancel(self, handler):
+        """Cancel the running, queued and debounced runs of a handler."""
+        state = self._state(handler)
+        if state.timer is not None:
+            state.timer.cancel()
+            state.timer = None
+        state.pending.clear()
+        for task in state.running:
+            task.cancel()
+        self._release(handler)
+
+    def cancel_all(self):
+        """Cancel all running, queued and debounced tasks."""
+        for handler, state in list(self._states.items()):
+            if state.timer is not None:
+                state.timer.cancel()
+                state.timer = None
+            state.pending.clear()
+            self._release(handler)
+        for task in list(self._tasks):
+            task.cancel()
+
+
+supervisor = TaskSupervisor()
+
 
 class AsyncButton:
     """An async implementation of a clickable item."""
 
-    def __init__(self, text, handler=None, width=12, finished_callback=None):
+    def __init__(
+        self,
+        text,
+        handler=None,
+        width=12,
+        finished_callback=None,
+        policy=None,
+        limit=1,
+    ):
         assert isinstance(width, int)
-        self.loop = asyncio.get_event_loop()
         if handler:
             if not asyncio.iscoroutinefunction(handler):
                 raise Exception("handler is not a coroutine function.")
+            if policy:
+                supervisor.set_policy(handler, policy, limit)
 
         self._call_back = finished_callback
 
@@ -54,9 +325,9 @@ class AsyncButton:
         @kb.add("enter")
         def _(event):
             if self.handler:
-                _task = self.loop.create_task(self.async_handler(event))
-                if self._call_back:
-                    _task.add_done_callback(self._call_back)
+                supervisor.run(
+                    self.handler, event, done_callback=self._call_back
+                )
 
         return kb
 
@@ -65,7 +336,12 @@ class AsyncButton:
 
         def handler(mouse_event):
             if mouse_event.event_type == MouseEventType.MOUSE_UP:
-                self.handler()
+                if self.handler:
+                    supervisor.run(
+                        self.handler,
+                        mouse_event,
+                        done_callback=self._call_back,
+                    )
 
         return [
             ("[SetCursorPosition]", ""),
@@ -0,0 +1,193 @@
+from prompt_toolkit.application import get_app
+from prompt_toolkit.layout import (
+    DynamicContainer,
+    FormattedTextControl,
+    HSplit,
+    Window,
+)
+from prompt_toolkit.mouse_events import MouseEventType
+
+from pttui.output_buffer import OutputBuffer
+from pttui.output_view import OutputView
+
+
+class Channel:
+    """A named output with its own bounded buffer.
+
+    The view is only created when the channel is shown for the first time.
+    A channel which is not shown is not rendered, output written to it is
+    only stored.
+    """
+
+    def __init__(self, name, buffer: OutputBuffer):
+        self.name = name
+        self.buffer = buffer
+        self._view = None
+        self._seen = 0
+
+    @property
+    def view(self):
+        if self._view is None:
+            self._view = OutputView(self.buffer)
+        return self._view
+
+    @property
+    def total_lines(self):
+        """Number of completed lines ever written, including evicted ones."""
+        # the last line of a buffer is the (open) line being written.
+        return self.buffer.first_line_number + self.buffer.line_count - 1
+
+    @property
+    def unread(self):
+        """Number of lines written since the channel was last shown."""
+        return max(0, self.total_lines - self._seen)
+
+    def mark_read(self):
+        self._seen = self.total_lines
+
+
+class _Route:
+    __slots__ = ("channel", "logger", "level")
+
+    def __init__(self, channel, logger, level):
+        self.channel = channel
+        self.logger = logger
+        self.level = level
+
+    def matches(self, record):
+        if self.level is not None and record.levelno < self.level:
+            return False
+        if self.logger is None:
+            return True
+        name = record.name
+        return name == self.logger or name.startswith(self.logger + ".")
+
+
+class Channels:
+    """The named output channels, shown as tabs.
+
+    One channel is shown at a time, optionally with a second channel split
+    below it. Log records are sent to a channel by routing rules, see
+    `add_route`.
+
+    :param default: Name of the channel which receives everything which is
+        not routed elsewhere.
+    """
+
+    def __init__(self, default="main"):
+        self.default = default
+        self._channels = {}
+        self._routes = []
+        self.current = default
+        self.split = None
+        self._body_key = None
+        self._body = None
+        self.tab_bar = Window(
+            FormattedTextControl(self._get_tab_fragments),
+            height=1,
+            style="class:channel-tabs",
+        )
+        self.container = HSplit(
+            [self.tab_bar, DynamicContainer(self._get_body)]
+        )
+
+    def __contains__(self, name):
+        return name in self._channels
+
+    def __iter__(self):
+        return iter(self._channels.values())
+
+    def add(self, name, buffer=None, max_lines=None, max_chars=None):
+        """Add a channel. Without a buffer a new one is created with the
+        given scrollback limits."""
+        assert name not in self._channels, "Channel {} exists".format(name)
+        if buffer is None:
+            buffer = OutputBuffer(max_lines=max_lines, max_chars=max_chars)
+        channel = self._channels[name] = Channel(name, buffer)
+        self._invalidate()
+        return channel
+
+    def get(self, name=None):
+        """Return the channel, or the default channel for None."""
+        return self._channels[self.default if name is None else name]
+
+    def add_route(self, channel, logger=None, level=None):
+        """Send log records to channel.
+
+        :param logger: Only records of this logger and its children.
+        :param level: Only records of this level or higher.
+
+        The first matching route is used.
+        """
+        assert channel in self._channels, "Unknown channel " + channel
+        self._routes.append(_Route(channel, logger, level))
+
+    def channel_for(self, record):
+        """Return the name of the channel a log record is routed to."""
+        for route in self._routes:
+            if route.matches(record):
+                return route.channel
+        return self.default
+
+    def show(self, name):
+        """Show channel name in the (top) pane."""
+        self.get(name).mark_read()
+        self.current = name
+        if self.split == name:
+            self.split = None
+        self._invalidate()
+        app = get_app()
+        if app.layout.has_focus(self.container):
+            app.layout.focus(self.get(name).view.window)
+
+    def show_next(self, step=1):
+        names = list(self._channels)
+        self.show(names[(names.index(self.current) + step) % len(names)])
+
+    def set_split(self, name=None):
+        """Show channel name below the current channel, None to unsplit."""
+        if name is not None:
+            self.get(name).mark_read()
+        self.split = None if name == self.current else name
+        self._invalidate()
+
+    def _invalidate(self):
+        app = get_app()
+        if app.is_running:
+            app.invalidate()
+
+    def _get_body(self):
+        current = self.get(self.current)
+        current.mark_read()
+        if self.split is None:
+            return current.view
+        split = self.get(self.split)
+        split.mark_read()
+        if self._body_key != (self.current, self.split):
+            self._body_key = (self.current, self.split)
+            self._body = HSplit(
+                [current.view, Window(height=1, char="-"), split.view]
+            )
+        return self._body
+
+    def _tab_handler(self, name):
+        def handler(mouse_event):
+            if mouse_event.event_type == MouseEventType.MOUSE_UP:
+                self.show(name)
+                return None
+            return NotImplemented
+
+        return handler
+
+    def _get_tab_fragments(self):
+        fragments = []
+        for channel in self._channels.values():
+            style = "class:channel-tab"
+            if channel.name in (self.current, self.split):
+                style = "class:channel-tab.current"
+            text = " {} ".format(channel.name)
+            if channel.unread:
+                text = " {} ({}) ".format(channel.name, channel.unread)
+            fragments.append((style, text, self._tab_handler(channel.name)))
+            fragments.append(("", " "))
+        return fragments
@@ -1,16 +1,28 @@
-import asyncio
-from asyncio import Future
+import time
+from asyncio import Future, CancelledError
 from collections import Counter
-from typing import List
+from contextlib import contextmanager
+from typing import List, Union
 
 from prompt_toolkit.application import get_app
 from prompt_toolkit.key_binding import KeyBindings
-from prompt_toolkit.layout import HSplit, Window
+from prompt_toolkit.layout import HSplit, Window, to_container
 from prompt_toolkit.styles import Style
 from prompt_toolkit.widgets import Label, TextArea, HorizontalLine
 
-from pttui.async_widgets import AsyncButton
-from pttui.layout import set_current_sidebar
+from pttui.async_widgets import (
+    AsyncButton,
+    supervisor,
+    run_in_executor,
+    THREAD,
+    TOGGLE,
+)
+from pttui.layout import navigation, registry
+from pttui.animation import ticker
+from pttui.printers import print_line, print_dict
+from pttui.fuzzy import FuzzyFilter, FuzzyIndex
+from pttui.paged_source import PagedSource
+from pttui.virtual_list import VirtualList, IndexedView, get_item_text
 
 
 class SideBarItem:
@@ -29,11 +41,126 @@ class SideBarItemButton(SideBarItem):
     """A button in the sidebar."""
 
     def __init__(
-        self, text, handler, key_binding=None, append_key_to_text=True
+        self,
+        text,
+        handler,
+        key_binding=None,
+        append_key_to_text=True,
+        policy=None,
+        limit=1,
     ):
+        """
+        :param policy: The async_widgets policy (DROP, QUEUE,
+            CANCEL_PREVIOUS or DEBOUNCE) applied when the handler is
+            triggered while `limit` instances are still running.
+        """
         if append_key_to_text and key_binding:
             text = "{} [{}]".format(text, key_binding)
-        super().__init__(key_binding, handler, AsyncButton(text, handler))
+        super().__init__(
+            key_binding,
+            handler,
+            AsyncButton(text, handler, policy=policy, limit=limit),
+        )
+
+
+class SideBarItemExecutorButton(SideBarItemButton):
+    """A button which runs a blocking function in a thread or process pool.
+
+    A spinner is shown while the function runs and the result is printed
+    to the output pane. Pressing the button again cancels the run.
+    """
+
+    def __init__(
+        self,
+        text,
+        func,
+        key_binding=None,
+        append_key_to_text=True,
+        args=(),
+        executor=THREAD,
+        message=None,
+    ):
+        """
+        :param func: A blocking function, called as func(*args).
+        :param executor: async_widgets.THREAD, async_widgets.PROCESS or a
+            concurrent.futures.Executor.
+        """
+        message = message or text
+
+        async def handler(*_):
+            try:
+                with ticker.spinner(message):
+                    result = await run_in_executor(
+                        func, *args, executor=executor
+                    )
+            except CancelledError:
+                print_line("{} cancelled".format(message))
+                raise
+            if isinstance(result, (dict, list)):
+                print_dict(result)
+            elif result is not None:
+                print_line(result)
+
+        handler.__qualname__ = getattr(func, "__qualname__", repr(func))
+        super().__init__(
+            text, handler, key_binding, append_key_to_text, policy=TOGGLE
+        )
+
+
+class SideBarItemStreamButton(SideBarItemButton):
+    """A button which streams output to the output pane.
+
+    A spinner is shown while streaming. Pressing the button again cancels
+    the stream (and terminates the process of `stream_process`).
+    """
+
+    def __init__(
+        self,
+        text,
+        stream_func,
+        key_binding=None,
+        append_key_to_text=True,
+        message=None,
+    ):
+        """
+        :param stream_func: A coroutine function which streams the output,
+            for example `partial(stream_process, "ping", "localhost")` or
+            `lambda: stream(device.events(), lines=True)`.
+        """
+        message = message or text
+
+        async def handler(*_):
+            try:
+                with ticker.spinner(message):
+                    result = await stream_func()
+            except CancelledError:
+                print_line("{} cancelled".format(message))
+                raise
+            print_line("{} done".format(message))
+            return result
+
+        handler.__qualname__ = getattr(
+            stream_func, "__qualname__", repr(stream_func)
+        )
+        super().__init__(
+            text, handler, key_binding, append_key_to_text, policy=TOGGLE
+        )
+
+
+class SideBarItemList(SideBarItem):
+    """A scrollable list of selectable items.
+
+    Only the visible rows are rendered, so the size of the list does not
+    affect build time or memory use.
+    """
+
+    def __init__(self, source, handler, get_text=get_item_text):
+        """
+        :param source: A sequence of items.
+        :param handler: Coroutine function called with the selected item.
+        """
+        self.list = VirtualList(source, handler, get_text)
+        super().__init__(None, handler, self.list)
 
 
 class SideBarItemLabel(SideBarItem):
@@ -69,10 +196,13 @@ class SideBarItemSpace(SideBarItem):
 class SideBar:
     """A basic sidebar container"""
 
+    # Number of focusable items to skip on page up/down.
+    page_size = 10
+
     @staticmethod
     def make_async_binding(handler):
         def _(event):
-            asyncio.get_event_loop().create_task(handler(event))
+            supervisor.run(handler, event)
 
         return _
 
@@ -88,10 +218,17 @@ class SideBar:
         assert items is not None
         # assert len(items) > 0
         self.context = context
+        self._bound = {}
+        self._batch_depth = 0
         self._key_bindings = KeyBindings()
         self._key_bindings.add("up")(self.go_up)
         self._key_bindings.add("down")(self.go_down)
+        self._key_bindings.add("pageup")(self.go_page_up)
+        self._key_bindings.add("pagedown")(self.go_page_down)
+        self._key_bindings.add("home")(self.go_first)
+        self._key_bindings.add("end")(self.go_last)
         self._make_bindings()
+        registry.register(self, self._key_bindings)
         self._title = title
         self._container = None
         self.build()
@@ -111,65 +248,170 @@ class SideBar:
 
     def build(self):
         """Build the sidebar with its items."""
-        self._container = HSplit(
-            tuple(self._build()), key_bindings=self._key_bindings, width=25
+        start = time.perf_counter()
+        children = tuple(self._build())
+        # number of children in front of the items (the title).
+        self._offset = len(children) - len(self._items)
+        # the key bindings are installed by the layout through the registry.
+        self._container = HSplit(children, width=25)
+        self._index_focusable()
+        self.build_time = time.perf_counter() - start
+
+    def _index_focusable(self):
+        """Index the focusable children for constant time navigation."""
+        self._focusable = [
+            child
+            for child in self._container.children
+            if SideBar.is_focusable(child)
+        ]
+        self._focus_position = {
+            child: idx for idx, child in enumerate(self._focusable)
+        }
+        self._focus_dirty = False
+
+    def _focus_index(self):
+        if self._focus_dirty:
+            self._index_focusable()
+        return self._focusable, self._focus_position
+
+    def _changed(self):
+        self._focus_dirty = True
+        if not self._batch_depth:
+            get_app().invalidate()
+
+    @contextmanager
+    def batch(self):
+        """Context manager to apply multiple item changes with a single
+        redraw and focus index update."""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            self._changed()
+
+    def _has_focus(self, item):
+        return get_app().layout.has_focus(item)
+
+    def _refocus(self, idx):
+        """Focus the first focusable item at or after (before) idx."""
+        focusable = [
+            item
+            for item in self._items[idx:] + self._items[:idx][::-1]
+            if SideBar.is_focusable(to_container(item))
+        ]
+        if focusable:
+            get_app().layout.focus(focusable[0])
+
+    def insert_item(self, index, item: SideBarItem):
+        """Insert an item before index."""
+        assert isinstance(item, SideBarItem)
+        index = min(index, len(self._items))
+        self._bind(item)
+        self._items.insert(index, item)
+        self._container.children.insert(
+            self._offset + index, to_container(item)
         )
+        self._changed()
+
+    def remove_item(self, item: SideBarItem):
+        index = self._items.index(item)
+        focused = self._has_focus(item)
+        self._unbind(item)
+        del self._items[index]
+        del self._container.children[self._offset + index]
+        if focused:
+            self._refocus(index)
+        self._changed()
+
+    def replace_item(self, old: SideBarItem, new: SideBarItem):
+        assert isinstance(new, SideBarItem)
+        index = self._items.index(old)
+        focused = self._has_focus(old)
+        self._unbind(old)
+        try:
+            self._bind(new)
+        except AssertionError:
+            self._bind(old)
+            raise
+        self._items[index] = new
+        self._container.children[self._offset + index] = to_container(new)
+        if focused:
+            self._refocus(index)
+        self._changed()
+
+    def move_item(self, item: SideBarItem, index):
+        """Move an item to a new position, keeping its focus."""
+        current = self._items.index(item)
+        del self._items[current]
+        container = self._container.children.pop(self._offset + current)
+        index = min(index, len(self._items))
+        self._items.insert(index, item)
+        self._container.children.insert(self._offset + index, container)
+        self._changed()
 
     def add_item(self, item: SideBarItem):
-        assert isinstance(item, SideBarItem)
-        self._items.append(item)
-        self.build()
+        self.insert_item(len(self._items), item)
 
     def add_items(self, items: List[SideBarItem], clear=False):
-        if clear:
-            self._items = items
-        else:
-            self._items.extend(items)
-        self.build()
+        with self.batch():
+            if clear:
+                for item in list(self._items):
+                    self.remove_item(item)
+            for item in items:
+                self.add_item(item)
 
     @staticmethod
     def is_focusable(container):
         try:
-            return container.content.focusable()
+            return container.content.is_focusable()
         except AttributeError:
             return False
 
     @property
     def has_focusable_items(self):
-        for itm in self._container.children:
-            if SideBar.is_focusable(itm):
-                return True
-        return False
+        focusable, _ = self._focus_index()
+        return bool(focusable)
 
     def get_current(self, event):
         return self._container.children.index(event.app.layout.current_window)
 
-    def go_up(self, event):
-        def get_previous_focusable(previous_idx):
-            if previous_idx < 0:
-                return get_previous_focusable(
-                    len(self._container.children) - 1
-                )
+    def _focus_relative(self, event, step, wrap=True):
+        """Move the focus step focusable items up (negative) or down."""
+        focusable, position = self._focus_index()
+        if not focusable:
+            return
+        current = position.get(event.app.layout.current_window)
+        if current is None:
+            new = 0 if step > 0 else len(focusable) - 1
+        elif wrap:
+            new = (current + step) % len(focusable)
+        else:
+            new = max(0, min(current + step, len(focusable) - 1))
+        event.app.layout.focus(focusable[new])
 
-            if SideBar.is_focusable(self._container.children[previous_idx]):
-                return self._container.children[previous_idx]
-            return get_previous_focusable(previous_idx - 1)
+    def _focus_at(self, event, idx):
+        focusable, _ = self._focus_index()
+        if focusable:
+            event.app.layout.focus(focusable[idx])
 
-        current = self.get_current(event)
-        previous_focusable = get_previous_focusable(current - 1)
-        event.app.layout.focus(previous_focusable)
+    def go_up(self, event):
+        self._focus_relative(event, -1)
 
     def go_down(self, event):
-        def get_next_focusable(next_idx):
-            if next_idx == len(self._container.children):
-                return get_next_focusable(0)
-            if SideBar.is_focusable(self._container.children[next_idx]):
-                return self._container.children[next_idx]
-            return get_next_focusable(next_idx + 1)
+        self._focus_relative(event, 1)
+
+    def go_page_up(self, event):
+        self._focus_relative(event, -self.page_size, wrap=False)
 
-        current = self.get_current(event)
-        next_focusable = get_next_focusable(current + 1)
-        event.app.layout.focus(next_focusable)
+    def go_page_down(self, event):
+        self._focus_relative(event, self.page_size, wrap=False)
+
+    def go_first(self, event):
+        self._focus_at(event, 0)
+
+    def go_last(self, event):
+        self._focus_at(event, -1)
 
     def _validate_bindings(self):
         """Validate keybinding on duplicates."""
@@ -184,19 +426,82 @@ class SideBar:
         self._validate_bindings()
 
         for item in self._items:
-            if item.binding:
-                self._key_bindings.add(item.binding)(
-                    SideBar.make_async_binding(item.handler)
-                )
+            self._bind(item)
+
+    def _bind(self, item):
+        if not item.binding:
+            return
+        if item.binding in self._bound:
+            raise AssertionError(
+                "Key binding -%s- is defined more than once" % item.binding
+            )
+        registry.check(item.binding)
+        handler = SideBar.make_async_binding(item.handler)
+        self._key_bindings.add(item.binding)(handler)
+        self._bound[item.binding] = handler
+
+    def _unbind(self, item):
+        if item.binding:
+            self._key_bindings.remove(self._bound.pop(item.binding))
 
     def show(self):
-        set_current_sidebar(self)
+        """Show this sidebar as the root of the navigation stack."""
+        navigation.reset(self)
+
+    def push(self):
+        """Show this sidebar on top of the navigation stack."""
+        navigation.push(self)
+
+    def close(self):
+        """Return to the previous sidebar.
+
+        That is the sidebar below this one on the navigation stack, or the
+        parent container when this sidebar was not pushed.
+        """
+        if navigation.top is self and len(navigation) > 1:
+            navigation.pop()
+        elif self.parent_container is not None:
+            self.parent_container.show()
 
     def __pt_container__(self):
         return self._container
 
 
-class SideBarYesNo(SideBar):
+class SideBarDialog(SideBar):
+    """A sidebar which returns a result through its future.
+
+    A dialog can be opened any number of times: `ask` resets it and shows
+    it on top of the navigation stack. Keep it around (see
+    `layout.sidebar_cache`) instead of building a new one for every
+    question.
+    """
+
+    def __init__(self, context, items, parent_container, title=None):
+        super().__init__(context, items, parent_container, title=title)
+        self.future = Future()
+
+    def reset(self):
+        """Prepare the dialog for a new question.
+
+        A result which is still pending is cancelled.
+        """
+        if not self.future.done():
+            self.future.cancel()
+        self.future = Future()
+
+    async def ask(self):
+        """Show the dialog and return its result."""
+        self.reset()
+        self.push()
+        return await self.future
+
+    def _finish(self, result):
+        if not self.future.done():
+            self.future.set_result(result)
+        self.close()
+
+
+class SideBarYesNo(SideBarDialog):
     """A menu item which asks the user for yes/no input."""
 
     def __init__(self, context, parent_container, label=None, title=None):
@@ -209,26 +514,51 @@ class SideBarYesNo(SideBar):
         children.append(SideBarItemButton("NO [n]", self._no, "n"))
         super().__init__(context, children, parent_container, title=title)
 
-        self.future = Future()
-
     async def _yes(self, *args):
-        self.future.set_result(True)
-        self.parent_container.show()
+        self._finish(True)
 
     async def _no(self, *args):
-        self.future.set_result(False)
-        self.parent_container.show()
+        self._finish(False)
+
+
+class SideBarSelectableList(SideBarDialog):
+    """A menu sidebar with selectable items.
 
+    items is a list of dicts or a PagedSource, which shows the first page
+    as soon as it is loaded and loads the next pages while scrolling.
 
-class SideBarSelectableList(SideBar):
-    """A menu sidebar with selectable items."""
+    With filterable=True a filter field is shown above the items. Typing
+    narrows the items down to the ones fuzzy matching the filter text, best
+    match first. Enter selects the best match. The filter searches the
+    items loaded so far.
+    """
 
     def __init__(
-        self, context, items: List[dict], parent_container, title=None
+        self,
+        context,
+        items: Union[List[dict], PagedSource],
+        parent_container,
+        title=None,
+        filterable=False,
     ):
+        self._source = items
+        self._list_item = SideBarItemList(items, self._selected)
+        self.filter_field = None
         children = []
-        for item in items:
-            children.append(SideBarItemButton(item["text"], self.select(item)))
+        if filterable:
+            self._filter = FuzzyFilter(
+                lambda: FuzzyIndex(get_item_text(item) for item in items),
+                self._filtered,
+            )
+            self.filter_field = TextArea(multiline=False, prompt="filter: ")
+            self.filter_field.buffer.on_text_changed += (
+                lambda buffer: self._filter.update(buffer.text)
+            )
+            self.filter_field.buffer.accept_handler = self._accept_filter
+            if isinstance(items, PagedSource):
+                items.on_change += lambda sender: self._filter.reset()
+            children.append(SideBarItem(None, None, self.filter_field))
+        children.append(self._list_item)
         children.append(SideBarItemLine())
         children.append(
             SideBarItemButton(
@@ -237,21 +567,46 @@ class SideBarSelectableList(SideBar):
         )
         super().__init__(context, children, parent_container, title=title)
 
-        self.future = Future()
+    def reset(self):
+        super().reset()
+        if self.filter_field is not None:
+            self.filter_field.text = ""
+        self._list_item.list.control.move_cursor(0)
+
+    def close(self):
+        if isinstance(self._source, PagedSource):
+            self._source.close()
+        super().close()
 
     async def cancel(self, *args):
-        self.future.set_result(None)
-        self.parent_container.show()
+        self._finish(None)
+
+    async def _selected(self, item):
+        self._finish(item)
+
+    def _filtered(self, indexes):
+        source = self._source
+        if indexes is not None:
+            source = IndexedView(self._source, indexes)
+        self._list_item.list.control.set_source(source)
+
+    def _accept_filter(self, buffer):
+        supervisor.run(self._select_best_match)
+        return True
+
+    async def _select_best_match(self):
+        # the filter text may not have been applied to the list yet.
+        await self._filter.wait()
+        self._list_item.list.control.select(0)
 
     def select(self, item):
         async def selected(*args):
-            self.future.set_result(item)
-            self.parent_container.show()
+            await self._selected(item)
 
         return selected
 
 
-class SideBarForm(SideBar):
+class SideBarForm(SideBarDialog):
     """A menu sidebar as a form with ok and cancel option"""
 
     def __init__(
@@ -264,18 +619,20 @@ class SideBarForm(SideBar):
 
         super().__init__(context, items, parent_container, title=title)
 
-        self.future = Future()
         self.data = {}
 
+    def reset(self):
+        super().reset()
+        self.data = {}
+        for item in self._items:
+            if isinstance(item, SideBarItemTextEntry):
+                item.container.text = ""
+
     async def ok(self, *args):
         for item in self._items:
             if isinstance(item, SideBarItemTextEntry) and item.key:
                 self.data[item.key] = item.container.text
-        self.future.set_result(self.data)
-
-        self.parent_container.show()
+        self._finish(self.data)
 
     async def cancel(self, *args):
-        self.future.set_result(None)
-
-        self.parent_container.show()
+        self._finish(None)
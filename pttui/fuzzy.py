@@ -0,0 +1,140 @@
+import asyncio
+import re
+
+from pttui.async_widgets import run_in_executor
+
+# Number of items matched before yielding to the event loop.
+CHUNK_SIZE = 5000
+# Searches over more candidates than this run in a worker thread.
+OFFLOAD_THRESHOLD = 50000
+
+
+class FuzzyIndex:
+    """Search index over item texts for type-ahead filtering.
+
+    A query matches a text when all of its characters appear in the text
+    in the same order (case insensitive). Matches are ranked on the length
+    of the matched span, then on its position and then on text length.
+    """
+
+    def __init__(self, texts):
+        self.texts = [text.lower() for text in texts]
+
+    def __len__(self):
+        return len(self.texts)
+
+    @staticmethod
+    def _pattern(query):
+        return re.compile(
+            ".*?".join(re.escape(char) for char in query.lower())
+        )
+
+    def match(self, query, candidates):
+        """Return a (score, index) tuple for every matching candidate.
+
+        candidates is a sequence of indexes into the texts. A lower score
+        is a better match.
+        """
+        search = self._pattern(query).search
+        texts = self.texts
+        result = []
+        for idx in candidates:
+            text = texts[idx]
+            found = search(text)
+            if found:
+                start, end = found.span()
+                result.append(((end - start, start, len(text)), idx))
+        return result
+
+    def rank(self, query, candidates):
+        """Return the matching candidates, best match first."""
+        matches = self.match(query, candidates)
+        matches.sort()
+        return [idx for _, idx in matches]
+
+
+class FuzzyFilter:
+    """Filters a FuzzyIndex while the user types, off the key handler.
+
+    Every update cancels the previous search. A query which extends the
+    previous one only searches the previous matches. Small searches run in
+    chunks on the event loop, large ones (and building the index) in a
+    worker thread. The index is built once, searches started while it is
+    being built wait for the same build.
+
+    :param on_result: Called with the ranked matching indexes, or None for
+        an empty query (no filter).
+    """
+
+    def __init__(self, get_index, on_result):
+        self._get_index = get_index
+        self._index = None
+        self._build = None
+        self.on_result = on_result
+        self._task = None
+        self._query = ""
+        self._matches = None
+
+    def reset(self):
+        """Rebuild the index, for example after items have been added."""
+        self._index = None
+        self._build = None
+        self._matches = None
+        if self._query:
+            self.update(self._query)
+
+    def update(self, query):
+        if self._task is not None:
+            self._task.cancel()
+        self._task = asyncio.ensure_future(self._filter(query))
+
+    async def wait(self):
+        """Wait until the result of the last update has been delivered."""
+        while self._task is not None and not self._task.done():
+            # the task is replaced when it is cancelled by a new update.
+            await asyncio.wait([self._task])
+
+    async def _load_index(self):
+        if self._index is not None:
+            return self._index
+        if self._build is None:
+            self._build = run_in_executor(self._get_index)
+            self._build.add_done_callback(self._built)
+        # a cancelled search must not cancel the build other searches
+        # wait for.
+        return await asyncio.shield(self._build)
+
+    def _built(self, build):
+        # a build started before a reset is outdated.
+        if build is self._build:
+            self._build = None
+            if not build.cancelled() and build.exception() is None:
+                self._index = build.result()
+
+    async def _filter(self, query):
+        if not query:
+            self._query = ""
+            self._matches = None
+            self.on_result(None)
+            return
+
+        index = await self._load_index()
+        candidates = range(len(index))
+        if self._matches is not None and query.startswith(self._query):
+            candidates = self._matches
+
+        if len(candidates) > OFFLOAD_THRESHOLD:
+            ranked = await run_in_executor(index.rank, query, candidates)
+        else:
+            matches = []
+            for start in range(0, len(candidates), CHUNK_SIZE):
+                matches.extend(
+                    index.match(query, candidates[start : start + CHUNK_SIZE])
+                )
+                await asyncio.sleep(0)
+            matches.sort()
+            ranked = [idx for _, idx in matches]
+
+        self._query = query
+        self._matches = ranked
+        self.on_result(ranked)
@@ -1,3 +1,6 @@
+import asyncio
+
+
 def get_following(sequence, current=0):
     """Get a next or previous item from a sequence in an infinite loop."""
 
@@ -20,3 +23,25 @@ class Context:
     """Context class which gets passed around across the various sidebars."""
 
     pass
+
+
+def running_loop():
+    """Return the running event loop of this thread or None."""
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def use_uvloop():
+    """Use uvloop for new event loops when it is installed.
+
+    Call it before the event loop is created (before `asyncio.run`).
+    Returns whether uvloop is used.
+    """
+    try:
+        import uvloop
+    except ImportError:
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
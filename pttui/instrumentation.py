@@ -0,0 +1,207 @@
+import json
+import time
+from collections import deque
+
+from prompt_toolkit.application import get_app
+
+from pttui import printers
+from pttui.async_widgets import supervisor
+from pttui.helpers import running_loop
+from pttui.layout import channels, get_current_sidebar, status
+
+HUD_SEGMENT = "hud"
+
+
+class Instrumentation:
+    """Opt-in performance metrics of the running application.
+
+    Nothing is measured until `enable` is called. Once enabled, render
+    durations and invalidations are counted through the application events
+    and every interval a snapshot is taken of:
+
+    - frame rate and render duration
+    - invalidations per second
+    - output size (of all channels) in lines and characters
+    - event loop lag (how late the interval timer fires)
+    - queued and dropped log records of all QueueLogHandlers
+    - in flight handler tasks and how long they have been running
+    - build time of the current sidebar
+
+    The last snapshot can be shown in the status bar (the "hud") and the
+    snapshots can be written to a file, one json object per line.
+
+    :param interval: Seconds between snapshots.
+    :param history: Number of snapshots kept for `export`.
+    """
+
+    def __init__(self, interval=1.0, history=3600):
+        self.interval = interval
+        self.enabled = False
+        self.visible = False
+        self.snapshot = None
+        self.history = deque(maxlen=history)
+        self._app = None
+        self._handle = None
+        self._export = None
+        self._reset_counters()
+
+    def _reset_counters(self):
+        self._frames = 0
+        self._render_time = 0.0
+        self._render_max = 0.0
+        self._render_start = None
+        self._invalidations = 0
+        self._started = time.monotonic()
+
+    def enable(self, app=None, export_path=None, visible=True):
+        """Start measuring.
+
+        :param export_path: Append every snapshot to this file.
+        :param visible: Show the hud in the status bar.
+        """
+        if export_path is not None:
+            self._close_export()
+            self._export = open(export_path, "a")
+        self.visible = visible
+        if visible:
+            self._show()
+        if self.enabled:
+            return
+        self._app = app or get_app()
+        self._app.before_render += self._before_render
+        self._app.after_render += self._after_render
+        self._app.on_invalidate += self._on_invalidate
+        self.enabled = True
+        self._reset_counters()
+        self._schedule()
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self._app.before_render -= self._before_render
+        self._app.after_render -= self._after_render
+        self._app.on_invalidate -= self._on_invalidate
+        self._app = None
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        self._close_export()
+        status.remove(HUD_SEGMENT)
+        self.enabled = False
+
+    def toggle(self, app=None):
+        """Show or hide the hud, measuring starts when it is first shown."""
+        if not self.enabled:
+            self.enable(app)
+        elif self.visible:
+            self.visible = False
+            status.remove(HUD_SEGMENT)
+        else:
+            self.visible = True
+            self._show()
+
+    def export(self, path):
+        """Write the kept snapshots to path, one json object per line."""
+        with open(path, "w") as fle:
+            for snapshot in self.history:
+                fle.write(json.dumps(snapshot) + "\n")
+
+    def _close_export(self):
+        if self._export is not None:
+            self._export.close()
+            self._export = None
+
+    def _before_render(self, sender):
+        self._render_start = time.perf_counter()
+
+    def _after_render(self, sender):
+        if self._render_start is None:
+            return
+        duration = time.perf_counter() - self._render_start
+        self._render_start = None
+        self._frames += 1
+        self._render_time += duration
+        self._render_max = max(self._render_max, duration)
+
+    def _on_invalidate(self, sender):
+        self._invalidations += 1
+
+    def _schedule(self):
+        loop = running_loop()
+        if loop is not None:
+            self._expected = loop.time() + self.interval
+            self._handle = loop.call_later(self.interval, self._tick)
+
+    def _tick(self):
+        self._handle = None
+        lag = max(0.0, running_loop().time() - self._expected)
+        self.snapshot = self.take_snapshot(lag)
+        self.history.append(self.snapshot)
+        if self._export is not None:
+            self._export.write(json.dumps(self.snapshot) + "\n")
+            self._export.flush()
+        if self.visible:
+            self._show()
+        self._reset_counters()
+        self._schedule()
+
+    def take_snapshot(self, loop_lag=0.0):
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        log_handlers = list(printers._queue_log_handlers)
+        buffers = [channel.buffer for channel in channels]
+        loop = running_loop()
+        # the default loop clock is time.monotonic.
+        now = time.monotonic() if loop is None else loop.time()
+        tasks = [
+            {"handler": name, "running_s": now - start}
+            for name, start in supervisor.in_flight.values()
+        ]
+        sidebar = get_current_sidebar()
+        return {
+            "time": time.time(),
+            "fps": self._frames / elapsed,
+            "render_mean_s": self._render_time / self._frames
+            if self._frames
+            else 0.0,
+            "render_max_s": self._render_max,
+            "invalidations_per_s": self._invalidations / elapsed,
+            "buffer_lines": sum(buffer.line_count for buffer in buffers),
+            "buffer_chars": sum(buffer.size for buffer in buffers),
+            "buffer_spilled_lines": sum(
+                buffer.spilled_lines for buffer in buffers
+            ),
+            "loop_lag_s": loop_lag,
+            "log_queued": sum(handler.queued for handler in log_handlers),
+            "log_dropped": sum(handler.dropped for handler in log_handlers),
+            "writes_coalesced": sum(
+                queue.coalesced for queue in printers._write_queues.values()
+            ),
+            "tasks": tasks,
+            "sidebar_build_s": getattr(sidebar, "build_time", None),
+        }
+
+    def _show(self):
+        snapshot = self.snapshot
+        if snapshot is None:
+            text = "hud: measuring"
+        else:
+            longest = max(
+                (task["running_s"] for task in snapshot["tasks"]), default=0
+            )
+            text = (
+                "fps {:.0f} render {:.1f}ms inv/s {:.0f} lines {} "
+                "lag {:.0f}ms log {} tasks {} ({:.1f}s)".format(
+                    snapshot["fps"],
+                    snapshot["render_mean_s"] * 1000,
+                    snapshot["invalidations_per_s"],
+                    snapshot["buffer_lines"],
+                    snapshot["loop_lag_s"] * 1000,
+                    snapshot["log_queued"],
+                    len(snapshot["tasks"]),
+                    longest,
+                )
+            )
+        status.set(HUD_SEGMENT, [("class:hud", text)], priority=100, order=0)
+
+
+instrumentation = Instrumentation()
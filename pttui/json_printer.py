@@ -0,0 +1,122 @@
+from json.encoder import encode_basestring_ascii
+
+KEY_STYLE = "class:green"
+INT_STYLE = "class:orange"
+FLOAT_STYLE = "class:yellow"
+CONSTANT_STYLE = "class:red"
+STRING_STYLE = ""
+COLLAPSED_STYLE = "class:gray"
+
+_CONSTANTS = {True: "true", False: "false", None: "null"}
+
+
+def _scalar(value):
+    if value is None or value is True or value is False:
+        return CONSTANT_STYLE, _CONSTANTS[value]
+    if isinstance(value, str):
+        return STRING_STYLE, encode_basestring_ascii(value)
+    if isinstance(value, int):
+        return INT_STYLE, int.__repr__(value)
+    if isinstance(value, float):
+        if value != value:
+            return FLOAT_STYLE, "NaN"
+        if value in (float("inf"), float("-inf")):
+            return FLOAT_STYLE, "Infinity" if value > 0 else "-Infinity"
+        return FLOAT_STYLE, float.__repr__(value)
+    # not json serializable, show it as a string.
+    return STRING_STYLE, encode_basestring_ascii(str(value))
+
+
+def _key(key):
+    if isinstance(key, str):
+        return encode_basestring_ascii(key)
+    if key is None or key is True or key is False:
+        return '"{}"'.format(_CONSTANTS[key])
+    return encode_basestring_ascii(str(key))
+
+
+class JsonRenderer:
+    """Render data the way `json.dumps(data, indent=4)` lays it out.
+
+    The data is walked once and styled fragments are emitted directly, there
+    is no intermediate json string, lexer or markup involved.
+
+    :param indent: Number of spaces per nesting level.
+    :param max_depth: Containers nested deeper than this are collapsed to a
+        single placeholder line.
+    :param max_items: Only the first max_items of a container are rendered,
+        the rest is replaced by a placeholder line.
+    """
+
+    def __init__(self, indent=4, max_depth=None, max_items=None):
+        self.indent = indent
+        self.max_depth = max_depth
+        self.max_items = max_items
+
+    def lines(self, data):
+        """Yield the rendered lines, each line a list of fragments."""
+        yield from self._lines(data, [], "", 0)
+
+    def fragments(self, data):
+        """Return all rendered lines as one list of fragments."""
+        result = []
+        for line in self.lines(data):
+            result.extend(line)
+            result.append(("", "\n"))
+        if result:
+            result.pop()
+        return result
+
+    def _lines(self, value, head, tail, depth):
+        if isinstance(value, dict):
+            items = value.items()
+            opening, closing = "{", "}"
+        elif isinstance(value, (list, tuple)):
+            items = value
+            opening, closing = "[", "]"
+        else:
+            yield head + [_scalar(value), ("", tail)]
+            return
+
+        if not value:
+            yield head + [("", opening + closing + tail)]
+            return
+
+        if self.max_depth is not None and depth >= self.max_depth:
+            yield head + [
+                ("", opening),
+                (COLLAPSED_STYLE, " ... {} items ".format(len(value))),
+                ("", closing + tail),
+            ]
+            return
+
+        yield head + [("", opening)]
+
+        indent = " " * (self.indent * (depth + 1))
+        is_dict = opening == "{"
+        count = len(value)
+        shown = count
+        if self.max_items is not None:
+            shown = min(count, self.max_items)
+
+        for idx, item in enumerate(items):
+            if idx == shown:
+                break
+            comma = "," if idx < count - 1 else ""
+            if is_dict:
+                key, item = item
+                item_head = [
+                    ("", indent),
+                    (KEY_STYLE, _key(key)),
+                    ("", ": "),
+                ]
+            else:
+                item_head = [("", indent)]
+            yield from self._lines(item, item_head, comma, depth + 1)
+
+        if shown < count:
+            yield [
+                ("", indent),
+                (COLLAPSED_STYLE, "... {} more items".format(count - shown)),
+            ]
+        yield [("", " " * (self.indent * depth) + closing + tail)]
@@ -0,0 +1,95 @@
+from weakref import WeakKeyDictionary
+
+from prompt_toolkit.key_binding import KeyBindings
+from prompt_toolkit.key_binding.key_bindings import (
+    KeyBindingsBase,
+    _parse_key,
+)
+
+
+class _CurrentKeyBindings(KeyBindingsBase):
+    """Delegates to the key bindings of the current owner in a registry."""
+
+    def __init__(self, registry):
+        self._registry = registry
+
+    @property
+    def _current(self):
+        return self._registry.current_bindings()
+
+    @property
+    def _version(self):
+        current = self._current
+        return id(current), current._version
+
+    @property
+    def bindings(self):
+        return self._current.bindings
+
+    def get_bindings_for_keys(self, keys):
+        return self._current.get_bindings_for_keys(keys)
+
+    def get_bindings_starting_with_keys(self, keys):
+        return self._current.get_bindings_starting_with_keys(keys)
+
+
+class KeyBindingRegistry:
+    """Central registry of the sidebar key bindings.
+
+    Every sidebar compiles its bindings once, into its own KeyBindings which
+    is registered here and reused every time the sidebar is shown. The
+    layout installs `key_bindings` once. It delegates to the bindings of the
+    current sidebar, so switching sidebars does not create or merge any
+    key bindings.
+
+    A sidebar binding on a key of the global bindings would silently shadow
+    the global one, registering it raises an AssertionError.
+
+    :param global_bindings: The application wide KeyBindings.
+    :param get_current: Returns the owner whose bindings are active.
+    """
+
+    def __init__(self, global_bindings, get_current):
+        self.global_bindings = global_bindings
+        self._get_current = get_current
+        self._registered = WeakKeyDictionary()
+        self._empty = KeyBindings()
+        self._global_keys = None
+        self._global_version = None
+        self.key_bindings = _CurrentKeyBindings(self)
+
+    def current_bindings(self):
+        try:
+            return self._registered[self._get_current()]
+        except (KeyError, TypeError):
+            return self._empty
+
+    def get(self, owner):
+        return self._registered.get(owner)
+
+    def _get_global_keys(self):
+        version = self.global_bindings._version
+        if version != self._global_version:
+            self._global_keys = {
+                binding.keys for binding in self.global_bindings.bindings
+            }
+            self._global_version = version
+        return self._global_keys
+
+    def check(self, *keys):
+        """Raise an AssertionError if the keys (as passed to
+        `KeyBindings.add`) conflict with a global key binding.
+
+        Check a binding before adding it, a rejected binding must not end
+        up in the owner's key bindings.
+        """
+        keys = tuple(_parse_key(key) for key in keys)
+        if keys in self._get_global_keys():
+            raise AssertionError(
+                "Key binding -%s- conflicts with a global key binding"
+                % ",".join(getattr(key, "value", key) for key in keys)
+            )
+
+    def register(self, owner, key_bindings):
+        """Register the compiled key bindings of owner."""
+        self._registered[owner] = key_bindings
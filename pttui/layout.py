@@ -1,12 +1,7 @@
 import logging
+from weakref import WeakSet
 
-from prompt_toolkit import HTML
 from prompt_toolkit.application import get_app
-from prompt_toolkit.buffer import Buffer
-from prompt_toolkit.formatted_text import (
-    to_formatted_text,
-    fragment_list_to_text,
-)
 from prompt_toolkit.key_binding import KeyBindings
 from prompt_toolkit.layout import (
     BufferControl,
@@ -14,40 +9,34 @@ from prompt_toolkit.layout import (
     VSplit,
     DynamicContainer,
     HSplit,
-    FormattedTextControl,
     Dimension,
     Layout,
 )
-from prompt_toolkit.layout.processors import Processor, Transformation
 from prompt_toolkit.styles import Style
-from prompt_toolkit.widgets import MenuContainer, TextArea
+from prompt_toolkit.widgets import MenuContainer
 
+from pttui.async_widgets import supervisor, shutdown_executors
+from pttui.channels import Channels
 from pttui.helpers import get_following
+from pttui.key_registry import KeyBindingRegistry
+from pttui.navigation import NavigationStack, SideBarCache
+from pttui.output_buffer import OutputBuffer
+from pttui.status_bar import StatusBar, StatusBarControl
 
 LOGGER = logging.getLogger(__name__)
 
 
-class FormatText(Processor):
-    def apply_transformation(self, ti):
-        try:
-            fragments = to_formatted_text(
-                HTML(fragment_list_to_text(ti.fragments))
-            )
-            return Transformation(fragments)
-        except Exception:
-            return Transformation(ti.fragments)
-
+# Number of output lines kept in memory. Use `output.set_scrollback` to
+# change the line and/or size limits and `output.set_history` to move
+# evicted lines to disk instead of dropping them.
+SCROLLBACK_LINES = 10000
 
-# todo: make textbuffer fixed length (for example: len = max(10000))
-
-_output_window = TextArea(
-    complete_while_typing=False,
-    scrollbar=True,
-    focus_on_click=True,
-    line_numbers=True,
-    input_processors=[FormatText()],
-)
-output = _output_window.buffer
+output = OutputBuffer(max_lines=SCROLLBACK_LINES)
+# The named output channels. `output` is the default ("main") channel,
+# add channels with `channels.add` and route log records to them with
+# `channels.add_route`.
+channels = Channels()
+output_view = channels.add("main", output).view
 
 kb = KeyBindings()
 
@@ -57,6 +46,24 @@ def _(event):
     event.app.exit()
 
 
+@kb.add("c-pagedown")
+def _(event):
+    channels.show_next(1)
+
+
+@kb.add("c-pageup")
+def _(event):
+    channels.show_next(-1)
+
+
+@kb.add("f12")
+def _(event):
+    # measuring is opt-in, nothing is loaded until the hud is asked for.
+    from pttui.instrumentation import instrumentation
+
+    instrumentation.toggle(event.app)
+
+
 _current_menu = None
 
 
@@ -65,42 +72,91 @@ def set_current_sidebar(menu):
     _current_menu = menu
     if menu.has_focusable_items:
         get_app().layout.focus(menu)
+    # a sidebar can be shown from a task, outside of a key handler.
+    get_app().invalidate()
 
 
 def get_current_sidebar():
     return _current_menu
 
 
+# The key bindings of all sidebars, see `SideBar`.
+registry = KeyBindingRegistry(kb, get_current_sidebar)
+
+navigation = NavigationStack(set_current_sidebar)
+sidebar_cache = SideBarCache()
+
+
 # ui_style = {"text_entry": "bg:#aaaaaa #888888", "status_bar": "bg:#aaaaaa"}
 ui_style = Style.from_dict({"status": "reverse", "shadow": "bg:#440044"})
 
 
 
-status = {"general": "Press CTRL-Q to quit"}
+status = StatusBar()
+status.set("general", "Press CTRL-Q to quit")
 
 
-def set_status(key, value):
-    """Add a status to the status bar."""
-    status[key] = value
-    status_bar.text = HTML(get_status())
+def set_status(key, value, priority=None, order=None, min_interval=None):
+    """Add a status to the status bar.
+
+    Only the changed segment is parsed, see `StatusBar.set` for the
+    options.
+    """
+    status.set(key, value, priority, order, min_interval)
 
 
 def get_status():
-    return " | ".join((val for val in status.values()))
+    return status.text
 
 
-status_bar = FormattedTextControl(
-    HTML(get_status()), show_cursor=False, style="class:status"
-)
+status_bar = StatusBarControl(status, style="class:status")
+
+_watched_apps = WeakSet()
+
+
+def _watch_exit(app):
+    """Cancel the running tasks whenever app exits, however it exits."""
+    if app in _watched_apps:
+        return
+    _watched_apps.add(app)
+
+    def watch():
+        # `app.future` is set while running, it is done when the app exits.
+        app.future.add_done_callback(exited)
+
+    def exited(future):
+        supervisor.cancel_all()
+        shutdown_executors()
+        # pre run callables are removed after a run, watch the next run too.
+        app.pre_run_callables.append(watch)
+
+    if app.future is not None and not app.future.done():
+        watch()
+    else:
+        app.pre_run_callables.append(watch)
 
 
 def get_layout(entry_point, top_menu_items):
-    set_current_sidebar(entry_point)
-    menu = DynamicContainer(get_current_sidebar)
+    """Return the layout with entry_point as the first sidebar.
+
+    Call it with the application set (`set_app`), the running tasks are
+    cancelled when that application exits.
+    """
+    # printers imports this module, it can only be imported once loaded.
+    from pttui.printers import attach_log_handlers
+
+    # log records from other threads are delivered to the running loop.
+    attach_log_handlers()
+    _watch_exit(get_app())
+    navigation.reset(entry_point)
+    menu = HSplit(
+        [DynamicContainer(get_current_sidebar)],
+        key_bindings=registry.key_bindings,
+    )
 
     # windows that are focused by pressing tab keys.
 
-    main_focus = [menu, _output_window]
+    main_focus = [menu, channels.container]
 
     following = get_following(main_focus)
 
@@ -119,7 +175,7 @@ def get_layout(entry_point, top_menu_items):
     root_container = HSplit(
         [
             VSplit(
-                [menu, Window(width=1, char="|"), _output_window],
+                [menu, Window(width=1, char="|"), channels.container],
                 height=Dimension(),
             ),
             Window(
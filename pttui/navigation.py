@@ -0,0 +1,84 @@
+from collections import OrderedDict
+
+
+class NavigationStack:
+    """The sidebars the user navigated through. The top one is shown.
+
+    :param show: Called with the sidebar to show.
+    """
+
+    def __init__(self, show):
+        self._show = show
+        self._stack = []
+
+    def __len__(self):
+        return len(self._stack)
+
+    @property
+    def top(self):
+        return self._stack[-1] if self._stack else None
+
+    def reset(self, sidebar):
+        """Make sidebar the only sidebar on the stack and show it."""
+        self._stack = [sidebar]
+        self._show(sidebar)
+
+    def push(self, sidebar):
+        """Show sidebar on top of the current one."""
+        if sidebar in self._stack:
+            # a sidebar is on the stack once, pushing it again moves it up.
+            self._stack.remove(sidebar)
+        self._stack.append(sidebar)
+        self._show(sidebar)
+
+    def pop(self):
+        """Remove the top sidebar and show the one below it.
+
+        The bottom sidebar is never removed. Returns the removed sidebar or
+        None.
+        """
+        if len(self._stack) < 2:
+            return None
+        sidebar = self._stack.pop()
+        self._show(self._stack[-1])
+        return sidebar
+
+    def replace(self, sidebar):
+        """Show sidebar instead of the top sidebar."""
+        if self._stack:
+            self._stack.pop()
+        self.push(sidebar)
+
+
+class SideBarCache:
+    """Least recently used cache of constructed sidebars.
+
+    Dialogs are expensive to build and cheap to reset, keep them around to
+    open them again instantly.
+    """
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self._sidebars = OrderedDict()
+
+    def __len__(self):
+        return len(self._sidebars)
+
+    def get(self, key, factory):
+        """Return the sidebar cached under key.
+
+        On a miss the sidebar is created by calling factory.
+        """
+        try:
+            self._sidebars.move_to_end(key)
+            return self._sidebars[key]
+        except KeyError:
+            pass
+        sidebar = factory()
+        self._sidebars[key] = sidebar
+        if len(self._sidebars) > self.maxsize:
+            self._sidebars.popitem(last=False)
+        return sidebar
+
+    def clear(self):
+        self._sidebars.clear()
@@ -0,0 +1,249 @@
+from functools import lru_cache
+
+from prompt_toolkit import HTML
+from prompt_toolkit.formatted_text import (
+    to_formatted_text,
+    fragment_list_to_text,
+    fragment_list_len,
+    split_lines,
+)
+from prompt_toolkit.utils import Event
+
+CHUNK_SIZE = 1024
+
+
+@lru_cache(maxsize=4096)
+def format_line(text):
+    """Convert a line of html markup to formatted text fragments.
+
+    The result is cached and shared, do not modify it in place.
+    """
+    if "<" not in text and "&" not in text:
+        return [("", text)]
+    try:
+        return to_formatted_text(HTML(text))
+    except Exception:
+        return [("", text)]
+
+
+class OutputBuffer:
+    """Append-only line store backing the output pane.
+
+    Every line is stored as a list of formatted text fragments, so markup is
+    parsed once when it is appended and never while rendering. Lines are
+    kept in fixed size chunks. Appending only touches the last
+    chunk (O(1) amortized) and looking up a line is an index calculation,
+    so the cost of a print does not depend on the size of the output.
+
+    With a history (an OutputHistory) lines evicted by the scrollback limits
+    are moved to disk instead of being dropped. They stay part of the
+    buffer and are read back from disk when they are displayed.
+    """
+
+    def __init__(
+        self,
+        chunk_size=CHUNK_SIZE,
+        max_lines=None,
+        max_chars=None,
+        history=None,
+    ):
+        self._chunk_size = chunk_size
+        self.max_lines = max_lines
+        self.max_chars = max_chars
+        self.history = history
+        # Incremented every time the buffer is cleared, so derived data
+        # (like a search index) can tell the lines have been replaced.
+        self.generation = -1
+        self._reset()
+        self.on_change = Event(self)
+        self.on_evict = Event(self)
+
+    def _reset(self):
+        self.generation += 1
+        self._chunks = [[[]]]
+        # Number of evicted lines still present at the start of the first
+        # chunk. They are released when the whole chunk is dropped.
+        self._head = 0
+        # Number of lines kept in memory.
+        self._line_count = 1
+        # Number of lines moved to the history.
+        self._spilled = 0
+        self._size = 0
+        self.cursor_line = 0
+        self.selection_start = None
+        self.dropped_lines = 0
+        self.dropped_chars = 0
+        self.last_evicted = 0
+
+    @property
+    def line_count(self):
+        return self._spilled + self._line_count
+
+    @property
+    def spilled_lines(self):
+        """Number of lines moved to the on-disk history."""
+        return self._spilled
+
+    @property
+    def size(self):
+        """Size of the (plain) text kept in memory in characters."""
+        return self._size
+
+    @property
+    def at_line_start(self):
+        """Whether the last line is empty, the next append then starts on
+        a line of its own."""
+        return not fragment_list_len(self._chunks[-1][-1])
+
+    @property
+    def first_line_number(self):
+        """Absolute (zero based) line number of the first stored line."""
+        return self.dropped_lines
+
+    def get_line(self, lineno):
+        """Return the fragments of a line."""
+        if lineno < self._spilled:
+            return self.history.get_line(lineno)
+        return self._get_memory_line(lineno - self._spilled)
+
+    def _get_memory_line(self, idx):
+        chunk, idx = divmod(idx + self._head, self._chunk_size)
+        return self._chunks[chunk][idx]
+
+    def lines(self):
+        if self._spilled:
+            yield from self.history.lines()
+        for chunk_idx, chunk in enumerate(self._chunks):
+            if chunk_idx == 0:
+                yield from chunk[self._head :]
+            else:
+                yield from chunk
+
+    @property
+    def text(self):
+        """The full output as one string. This is O(n), avoid in hot paths."""
+        return "\n".join(fragment_list_to_text(line) for line in self.lines())
+
+    def set_scrollback(self, max_lines=None, max_chars=None):
+        """Limit the output kept in memory to a number of lines and/or
+        characters."""
+        self.max_lines = max_lines
+        self.max_chars = max_chars
+        self._evict()
+        self.on_change.fire()
+
+    def set_history(self, history):
+        """Move evicted lines to history (an OutputHistory) instead of
+        dropping them. Can only be changed before lines have been moved.
+
+        The history is not closed by the buffer."""
+        if self._spilled:
+            raise ValueError("Lines have already been moved to the history.")
+        self.history = history
+
+    def append(self, text):
+        """Append html markup to the output.
+
+        Text up to the first newline is added to the last line, every
+        following newline starts a new line. Each line is parsed on its own.
+        """
+        self._append_lines([format_line(line) for line in text.split("\n")])
+
+    def append_fragments(self, fragments):
+        """Append formatted text fragments to the output."""
+        self._append_lines(list(split_lines(fragments)))
+
+    def _append_lines(self, new_lines):
+        chunk = self._chunks[-1]
+        chunk[-1] = chunk[-1] + new_lines[0]
+
+        pos = 1
+        while pos < len(new_lines):
+            if len(chunk) == self._chunk_size:
+                chunk = []
+                self._chunks.append(chunk)
+            end = pos + self._chunk_size - len(chunk)
+            chunk.extend(new_lines[pos:end])
+            pos = end
+        self._line_count += len(new_lines) - 1
+        self._size += len(new_lines) - 1
+        for line in new_lines:
+            self._size += fragment_list_len(line)
+        self._evict()
+        self.on_change.fire()
+
+    def _over_limit(self, line_count, size):
+        if self.max_lines is not None and line_count > self.max_lines:
+            return True
+        return self.max_chars is not None and size > self.max_chars
+
+    def _evict(self):
+        """Evict the oldest lines until the output fits the scrollback limits.
+
+        Evicted lines are skipped by moving the head offset; chunks are
+        released as a whole once all of their lines have been evicted.
+        """
+        if not self._over_limit(self._line_count, self._size):
+            return
+
+        count = 0
+        size = 0
+        # Always keep the last line, it is the one being appended to.
+        while count < self._line_count - 1 and self._over_limit(
+            self._line_count - count, self._size - size
+        ):
+            size += fragment_list_len(self._get_memory_line(count)) + 1
+            count += 1
+
+        if self.history is not None:
+            self.history.extend(
+                self._get_memory_line(idx) for idx in range(count)
+            )
+            self._spilled += count
+
+        drop_chunks, self._head = divmod(
+            self._head + count, self._chunk_size
+        )
+        del self._chunks[:drop_chunks]
+        self._line_count -= count
+        self._size -= size
+        if self.history is not None:
+            # the lines are still available, line numbers do not change.
+            return
+
+        self.dropped_lines += count
+        self.dropped_chars += size
+        self.cursor_line = max(0, self.cursor_line - count)
+        if self.selection_start is not None:
+            self.selection_start = max(0, self.selection_start - count)
+        self.last_evicted = count
+        self.on_evict.fire()
+
+    def clear(self):
+        if self.history is not None:
+            self.history.clear()
+        self._reset()
+        self.on_change.fire()
+
+    def move_cursor(self, lineno):
+        self.cursor_line = max(0, min(lineno, self.line_count - 1))
+        self.on_change.fire()
+
+    def scroll_to_end(self):
+        self.move_cursor(self.line_count - 1)
+
+    def start_selection(self):
+        self.selection_start = self.cursor_line
+
+    def clear_selection(self):
+        self.selection_start = None
+        self.on_change.fire()
+
+    def selection_range(self):
+        """Return the (first, last) selected line or None."""
+        if self.selection_start is None:
+            return None
+        return (
+            min(self.selection_start, self.cursor_line),
+            max(self.selection_start, self.cursor_line),
+        )
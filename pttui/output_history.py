@@ -0,0 +1,200 @@
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import weakref
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+
+from prompt_toolkit.formatted_text import fragment_list_to_text
+
+_OFFSET = struct.Struct("<Q")
+_ENCODER = json.JSONEncoder(separators=(",", ":"))
+
+
+class OutputHistory:
+    """Append-only on-disk log of output lines.
+
+    Every line is written as a json encoded fragment list to a data file.
+    The start offset of every line is written to an index file, so both
+    the data and the index live on disk and are read back through mmap.
+    Reading a line only touches the pages holding that line. A small cache
+    keeps recently decoded lines around for redraws.
+
+    The lower cased plain text of every line is written to a text file
+    (with its own index) as well, `find` searches it through mmap so
+    searching the history does not keep any of it in memory.
+
+    The history is owned by its creator, an OutputBuffer does not close
+    it. Call `close` once the buffer is no longer used.
+
+    :param path: Base path of the log. `<path>.log`, `<path>.idx`,
+        `<path>.txt` and `<path>.tidx` are created (and truncated).
+        Without a path a temporary directory is used, it is removed on
+        `close`, when the history is garbage collected or at the latest
+        when the interpreter exits.
+    """
+
+    def __init__(self, path=None, cache_size=1024):
+        self._remove_tmp_dir = None
+        if path is None:
+            tmp_dir = tempfile.mkdtemp(prefix="pttui-")
+            self._remove_tmp_dir = weakref.finalize(
+                self, shutil.rmtree, tmp_dir, ignore_errors=True
+            )
+            path = os.path.join(tmp_dir, "output")
+        self.path = path
+        self._cache_size = cache_size
+        self._data = open(path + ".log", "w+b")
+        self._index = open(path + ".idx", "w+b")
+        self._text = open(path + ".txt", "w+b")
+        self._text_index = open(path + ".tidx", "w+b")
+        self._reset()
+
+    def _reset(self):
+        self._size = 0
+        self._text_size = 0
+        self.line_count = 0
+        self._dirty = False
+        self._data_map = None
+        self._index_map = None
+        self._text_map = None
+        self._text_index_map = None
+        self._mapped_lines = 0
+        self._mapped_size = 0
+        self._mapped_text_size = 0
+        self._cache = OrderedDict()
+
+    @property
+    def _files(self):
+        return self._data, self._index, self._text, self._text_index
+
+    def extend(self, lines):
+        """Append lines (lists of fragments) to the log."""
+        encode = _ENCODER.encode
+        offsets = array("Q")
+        # the text index is only used on this machine, native byte order.
+        text_offsets = array("Q")
+        data = []
+        texts = []
+        for line in lines:
+            offsets.append(self._size)
+            fragments = [fragment[:2] for fragment in line]
+            encoded = (encode(fragments) + "\n").encode()
+            data.append(encoded)
+            self._size += len(encoded)
+
+            text_offsets.append(self._text_size)
+            text = (fragment_list_to_text(line).lower() + "\n").encode()
+            texts.append(text)
+            self._text_size += len(text)
+        if sys.byteorder != "little":
+            offsets.byteswap()
+        self._index.write(offsets.tobytes())
+        self._data.write(b"".join(data))
+        self._text_index.write(text_offsets.tobytes())
+        self._text.write(b"".join(texts))
+        self.line_count += len(offsets)
+        self._dirty = True
+
+    def _close_maps(self):
+        if self._data_map is not None:
+            self._data_map.close()
+            self._index_map.close()
+            self._text_map.close()
+            self._text_index_map.close()
+        self._data_map = self._index_map = None
+        self._text_map = self._text_index_map = None
+
+    def _remap(self):
+        if self._dirty:
+            for file in self._files:
+                file.flush()
+            self._dirty = False
+        self._close_maps()
+        (
+            self._data_map,
+            self._index_map,
+            self._text_map,
+            self._text_index_map,
+        ) = [
+            mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            for file in self._files
+        ]
+        self._mapped_lines = self.line_count
+        self._mapped_size = self._size
+        self._mapped_text_size = self._text_size
+
+    def get_line(self, lineno):
+        """Return the fragments of a line."""
+        try:
+            self._cache.move_to_end(lineno)
+            return self._cache[lineno]
+        except KeyError:
+            pass
+
+        if lineno >= self._mapped_lines:
+            if not 0 <= lineno < self.line_count:
+                raise IndexError(lineno)
+            self._remap()
+        (start,) = _OFFSET.unpack_from(self._index_map, lineno * 8)
+        if lineno + 1 < self._mapped_lines:
+            (end,) = _OFFSET.unpack_from(self._index_map, lineno * 8 + 8)
+        else:
+            end = self._mapped_size
+        line = [
+            tuple(fragment)
+            for fragment in json.loads(self._data_map[start : end - 1])
+        ]
+
+        self._cache[lineno] = line
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return line
+
+    def lines(self):
+        for lineno in range(self.line_count):
+            yield self.get_line(lineno)
+
+    def find(self, query, start, end, backwards=False):
+        """Return the first (or last) line in start..end (exclusive) which
+        contains query, or None.
+
+        query must be lower cased and can not contain a newline.
+        """
+        end = min(end, self.line_count)
+        if start >= end:
+            return None
+        if end > self._mapped_lines:
+            self._remap()
+        with memoryview(self._text_index_map) as view:
+            with view.cast("Q") as offsets:
+                low = offsets[start]
+                high = self._mapped_text_size
+                if end < self._mapped_lines:
+                    high = offsets[end]
+                if backwards:
+                    pos = self._text_map.rfind(query.encode(), low, high)
+                else:
+                    pos = self._text_map.find(query.encode(), low, high)
+                if pos == -1:
+                    return None
+                return bisect_right(offsets, pos) - 1
+
+    def clear(self):
+        self._close_maps()
+        for file in self._files:
+            file.truncate(0)
+            file.seek(0)
+        self._reset()
+
+    def close(self):
+        self._close_maps()
+        for file in self._files:
+            file.close()
+        if self._remove_tmp_dir is not None:
+            self._remove_tmp_dir()
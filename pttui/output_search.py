@@ -0,0 +1,255 @@
+from array import array
+from bisect import bisect_right
+
+from prompt_toolkit.formatted_text import fragment_list_to_text
+from prompt_toolkit.layout.utils import explode_text_fragments
+
+from pttui.helpers import running_loop
+from pttui.output_buffer import OutputBuffer
+
+BLOCK_SIZE = 1024
+# Number of lines indexed in one go from the event loop.
+SLICE_LINES = 1000
+
+
+class _Block:
+    """A sealed block of indexed lines, joined to one string."""
+
+    __slots__ = ("first", "text", "starts")
+
+    def __init__(self, first, lines):
+        self.first = first
+        self.text = "\n".join(lines)
+        self.starts = array("L")
+        offset = 0
+        for line in lines:
+            self.starts.append(offset)
+            offset += len(line) + 1
+
+    @property
+    def last(self):
+        return self.first + len(self.starts) - 1
+
+    def _line_end(self, idx):
+        if idx + 1 < len(self.starts):
+            return self.starts[idx + 1] - 1
+        return len(self.text)
+
+    def find(self, query, start, end, backwards=False):
+        """Return the first (or last) line in start..end (exclusive)
+        containing query."""
+        low = self.starts[start - self.first]
+        high = self._line_end(end - 1 - self.first)
+        if backwards:
+            pos = self.text.rfind(query, low, high)
+        else:
+            pos = self.text.find(query, low, high)
+        if pos == -1:
+            return None
+        return self.first + bisect_right(self.starts, pos) - 1
+
+
+class OutputSearch:
+    """Case insensitive plain text search over an OutputBuffer.
+
+    The lines kept in memory are indexed as output arrives, in slices of
+    `SLICE_LINES` lines run from the event loop, so neither printing nor
+    a search keystroke pays for indexing a large backlog. The markup
+    free, lower cased text of the lines is grouped in blocks which are
+    joined to one string, so searching a block is a single `str.find`.
+    Lines moved to the on-disk history are searched on disk (see
+    `OutputHistory.find`), the index only holds the lines in memory.
+
+    The index is created with the output view, output of a channel which
+    has never been shown is not indexed. Lines are addressed by their
+    absolute line number (see `OutputBuffer.first_line_number`).
+    """
+
+    def __init__(self, buffer: OutputBuffer, block_size=BLOCK_SIZE):
+        self.buffer = buffer
+        self._block_size = block_size
+        self._blocks = []
+        self._open = []
+        self._open_first = 0
+        self._generation = buffer.generation
+        self._handle = None
+        buffer.on_change += self._changed
+        self._changed()
+
+    @property
+    def _end(self):
+        """Absolute line number after the last indexed line."""
+        return self._open_first + len(self._open)
+
+    @property
+    def _memory_first(self):
+        """Absolute line number of the first line kept in memory."""
+        return self.buffer.first_line_number + self.buffer.spilled_lines
+
+    @property
+    def _buffer_end(self):
+        return self.buffer.first_line_number + self.buffer.line_count
+
+    @property
+    def pending(self):
+        """Number of lines which are not indexed yet."""
+        return self._buffer_end - max(self._end, self._memory_first)
+
+    def _changed(self, sender=None):
+        if self._handle is not None:
+            return
+        loop = running_loop()
+        if loop is not None:
+            self._handle = loop.call_soon(self._index_slice)
+
+    def _index_slice(self):
+        self._handle = None
+        self._sync(SLICE_LINES)
+        if self.pending > 0:
+            self._changed()
+
+    def _sync(self, limit=None):
+        """Index up to limit new lines."""
+        buffer = self.buffer
+        first = self._memory_first
+        end = self._buffer_end
+
+        if self._generation != buffer.generation:
+            # the buffer has been cleared.
+            self._generation = buffer.generation
+            self._blocks = []
+            self._open = []
+            self._open_first = first
+        # lines evicted or moved to the history leave the index.
+        while self._blocks and self._blocks[0].last < first:
+            del self._blocks[0]
+        if self._open_first < first:
+            del self._open[: first - self._open_first]
+            self._open_first = first
+
+        # The last indexed line may have been appended to. It is always part
+        # of the open block.
+        start = max(first, self._end - 1 if self._open else self._end)
+        if limit is not None:
+            end = min(end, start + limit)
+        del self._open[start - self._open_first :]
+        offset = buffer.first_line_number
+        for lineno in range(start, end):
+            self._open.append(
+                fragment_list_to_text(
+                    buffer.get_line(lineno - offset)
+                ).lower()
+            )
+            if (
+                len(self._open) == self._block_size
+                and lineno < self._buffer_end - 1
+            ):
+                self._blocks.append(_Block(self._open_first, self._open))
+                self._open = []
+                self._open_first = lineno + 1
+
+    def _find_open(self, query, start, end, backwards):
+        start = max(start, self._open_first)
+        lines = range(start, min(end, self._end))
+        if backwards:
+            lines = reversed(lines)
+        for lineno in lines:
+            if query in self._open[lineno - self._open_first]:
+                return lineno
+        return None
+
+    def _find_memory(self, query, start, end, backwards):
+        start = max(start, self._memory_first)
+        end = min(end, self._end)
+        if start >= end:
+            return None
+        if backwards:
+            lineno = self._find_open(query, start, end, True)
+            if lineno is not None:
+                return lineno
+        blocks = reversed(self._blocks) if backwards else self._blocks
+        for block in blocks:
+            block_start = max(start, block.first)
+            block_end = min(end, block.last + 1)
+            if block_start < block_end:
+                lineno = block.find(query, block_start, block_end, backwards)
+                if lineno is not None:
+                    return lineno
+        if not backwards:
+            return self._find_open(query, start, end, False)
+        return None
+
+    def _find_history(self, query, start, end, backwards):
+        buffer = self.buffer
+        end = min(end, self._memory_first)
+        if not buffer.spilled_lines or start >= end:
+            return None
+        offset = buffer.first_line_number
+        lineno = buffer.history.find(
+            query, start - offset, end - offset, backwards
+        )
+        return None if lineno is None else lineno + offset
+
+    def _find_range(self, query, start, end, backwards):
+        """Return the first (or last) line in start..end (exclusive)
+        containing query."""
+        # the history holds the lines before the lines in memory.
+        if backwards:
+            searches = (self._find_memory, self._find_history)
+        else:
+            searches = (self._find_history, self._find_memory)
+        for search in searches:
+            lineno = search(query, start, end, backwards)
+            if lineno is not None:
+                return lineno
+        return None
+
+    def find(self, query, start, backwards=False):
+        """Return the absolute line number of the first line containing
+        query, starting at line start and wrapping around at the end.
+        Returns None when there is no match.
+
+        Lines which are not indexed yet (just after a large burst of
+        output) are found once the index has caught up.
+        """
+        query = query.lower()
+        if not query or "\n" in query:
+            return None
+        if self.pending <= SLICE_LINES or running_loop() is None:
+            self._sync()
+        first = self.buffer.first_line_number
+        end = self._buffer_end
+        start = max(first, min(start, end - 1))
+
+        if backwards:
+            ranges = ((first, start + 1), (start + 1, end))
+        else:
+            ranges = ((start, end), (first, start))
+        for range_start, range_end in ranges:
+            lineno = self._find_range(query, range_start, range_end, backwards)
+            if lineno is not None:
+                return lineno
+        return None
+
+
+def highlight(fragments, query, style):
+    """Add style to every (case insensitive) occurrence of query."""
+    text = fragment_list_to_text(fragments)
+    lower = text.lower()
+    if len(lower) != len(text):
+        lower = text
+    query = query.lower()
+
+    pos = lower.find(query)
+    if not query or pos == -1:
+        return fragments
+
+    fragments = explode_text_fragments(fragments)
+    while pos != -1:
+        for idx in range(pos, pos + len(query)):
+            fragment = fragments[idx]
+            fragments[idx] = (fragment[0] + " " + style,) + tuple(
+                fragment[1:]
+            )
+        pos = lower.find(query, pos + len(query))
+    return fragments
@@ -0,0 +1,285 @@
+from prompt_toolkit.application import get_app
+from prompt_toolkit.data_structures import Point
+from prompt_toolkit.filters import Condition
+from prompt_toolkit.key_binding import KeyBindings
+from prompt_toolkit.layout import (
+    UIContent,
+    UIControl,
+    Window,
+    HSplit,
+    ConditionalContainer,
+)
+from prompt_toolkit.layout.margins import Margin, ScrollbarMargin
+from prompt_toolkit.mouse_events import MouseEventType
+from prompt_toolkit.widgets import TextArea
+
+from pttui.output_buffer import OutputBuffer
+from pttui.output_search import OutputSearch, highlight
+
+
+class LineNumberMargin(Margin):
+    """Line numbers which stay the same when old output is evicted."""
+
+    def __init__(self, buffer: OutputBuffer):
+        self.buffer = buffer
+
+    def get_width(self, get_ui_content):
+        last = self.buffer.first_line_number + self.buffer.line_count
+        return max(3, len(str(last)) + 1)
+
+    def create_margin(self, window_render_info, width, height):
+        first = self.buffer.first_line_number + 1
+        current = window_render_info.ui_content.cursor_position.y
+        result = []
+        last_lineno = None
+        for lineno in window_render_info.displayed_lines:
+            if lineno != last_lineno and lineno is not None:
+                style = "class:line-number"
+                if lineno == current:
+                    style = "class:line-number.current"
+                result.append(
+                    (style, str(lineno + first).rjust(width - 1) + " ")
+                )
+            result.append(("", "\n"))
+            last_lineno = lineno
+        return result
+
+
+class OutputControl(UIControl):
+    """Read-only control which renders an OutputBuffer.
+
+    Only the lines requested by the window (the visible ones) are fetched
+    from the buffer.
+    """
+
+    def __init__(self, buffer: OutputBuffer):
+        self.buffer = buffer
+        self.search_query = ""
+        self._key_bindings = self._make_key_bindings()
+
+    def is_focusable(self):
+        return True
+
+    def create_content(self, width, height):
+        buffer = self.buffer
+        selection = buffer.selection_range()
+        query = self.search_query
+
+        def get_line(lineno):
+            fragments = buffer.get_line(lineno)
+            if query:
+                style = "class:search"
+                if lineno == buffer.cursor_line:
+                    style = "class:search.current"
+                fragments = highlight(fragments, query, style)
+            if selection and selection[0] <= lineno <= selection[1]:
+                fragments = [
+                    ("{} class:selected".format(style), text)
+                    for style, text, *_ in fragments
+                ]
+            return fragments
+
+        return UIContent(
+            get_line=get_line,
+            line_count=buffer.line_count,
+            cursor_position=Point(x=0, y=buffer.cursor_line),
+            show_cursor=False,
+        )
+
+    def mouse_handler(self, mouse_event):
+        if mouse_event.event_type == MouseEventType.MOUSE_UP:
+            get_app().layout.current_control = self
+            self.buffer.move_cursor(mouse_event.position.y)
+            return None
+        return NotImplemented
+
+    def move_cursor_down(self):
+        self.buffer.move_cursor(self.buffer.cursor_line + 1)
+
+    def move_cursor_up(self):
+        self.buffer.move_cursor(self.buffer.cursor_line - 1)
+
+    def _page_size(self, event):
+        info = event.app.layout.current_window.render_info
+        if info is None:
+            return 1
+        return max(1, info.window_height - 1)
+
+    def _make_key_bindings(self):
+        kb = KeyBindings()
+
+        @kb.add("up")
+        def _(event):
+            self.move_cursor_up()
+
+        @kb.add("down")
+        def _(event):
+            self.move_cursor_down()
+
+        @kb.add("pageup")
+        def _(event):
+            self.buffer.move_cursor(
+                self.buffer.cursor_line - self._page_size(event)
+            )
+
+        @kb.add("pagedown")
+        def _(event):
+            self.buffer.move_cursor(
+                self.buffer.cursor_line + self._page_size(event)
+            )
+
+        @kb.add("home")
+        def _(event):
+            self.buffer.move_cursor(0)
+
+        @kb.add("end")
+        def _(event):
+            self.buffer.scroll_to_end()
+
+        return kb
+
+    def get_key_bindings(self):
+        return self._key_bindings
+
+    def get_invalidate_events(self):
+        yield self.buffer.on_change
+
+
+class OutputView:
+    """Scrollable output pane on top of an OutputBuffer.
+
+    Only the visible lines are fetched from the buffer when rendering and
+    line numbers are calculated from the line index, so the cost of a
+    redraw does not depend on the number of stored lines.
+    """
+
+    def __init__(self, buffer: OutputBuffer, line_numbers=True):
+        self.buffer = buffer
+        self.control = OutputControl(buffer)
+        left_margins = []
+        if line_numbers:
+            left_margins.append(LineNumberMargin(buffer))
+        self.window = Window(
+            self.control,
+            left_margins=left_margins,
+            right_margins=[ScrollbarMargin(display_arrows=True)],
+        )
+        buffer.on_evict += self._keep_scroll_position
+
+        self.search = OutputSearch(buffer)
+        self._searching = False
+        self._search_origin = 0
+        self._match = None
+        self.search_field = TextArea(
+            multiline=False, prompt="search: ", style="class:search-toolbar"
+        )
+        self.search_field.buffer.on_text_changed += self._search_changed
+        kb = self.control.get_key_bindings()
+        kb.add("/")(self._start_search)
+        kb.add("c-f")(self._start_search)
+        kb.add("n")(self._next_match)
+        kb.add("N")(self._previous_match)
+
+        self.container = HSplit(
+            [
+                self.window,
+                ConditionalContainer(
+                    HSplit(
+                        [self.search_field],
+                        key_bindings=self._search_key_bindings(),
+                    ),
+                    filter=Condition(lambda: self._searching),
+                ),
+            ]
+        )
+
+    def _keep_scroll_position(self, sender):
+        """Keep the visible lines in place when old output is evicted."""
+        self.window.vertical_scroll = max(
+            0, self.window.vertical_scroll - sender.last_evicted
+        )
+
+    def goto_line(self, lineno):
+        """Show the line with this (one based) line number at the top.
+
+        Line numbers are absolute, they include evicted lines. Jumping to an
+        evicted line shows the first stored line.
+        """
+        idx = lineno - 1 - self.buffer.first_line_number
+        idx = max(0, min(idx, self.buffer.line_count - 1))
+        self.window.vertical_scroll = idx
+        self.buffer.move_cursor(idx)
+
+    def _show(self, lineno):
+        """Move the cursor to an absolute line number."""
+        self.buffer.move_cursor(lineno - self.buffer.first_line_number)
+
+    def _start_search(self, event):
+        self._searching = True
+        self._search_origin = (
+            self.buffer.first_line_number + self.buffer.cursor_line
+        )
+        self._match = None
+        self.search_field.text = ""
+        event.app.layout.focus(self.search_field)
+
+    def _search_changed(self, sender):
+        query = self.search_field.text
+        previous = self.control.search_query
+        self.control.search_query = query
+        if not query:
+            self._match = None
+            self._show(self._search_origin)
+            return
+
+        start = self._search_origin
+        if self._match is not None and query.startswith(previous):
+            # A line matching the longer query also matches the previous
+            # one, so there is no match before the current one.
+            start = self._match
+        self._match = self.search.find(query, start)
+        if self._match is not None:
+            self._show(self._match)
+        else:
+            self.buffer.on_change.fire()
+
+    def _jump(self, backwards):
+        if not self.control.search_query:
+            return
+        current = self._match
+        if current is None:
+            current = self.buffer.first_line_number + self.buffer.cursor_line
+        start = current - 1 if backwards else current + 1
+        match = self.search.find(self.control.search_query, start, backwards)
+        if match is not None:
+            self._match = match
+            self._show(match)
+
+    def _next_match(self, event):
+        self._jump(backwards=False)
+
+    def _previous_match(self, event):
+        self._jump(backwards=True)
+
+    def _search_key_bindings(self):
+        kb = KeyBindings()
+
+        @kb.add("enter")
+        def _(event):
+            self._searching = False
+            event.app.layout.focus(self.window)
+
+        @kb.add("escape")
+        def _(event):
+            self._searching = False
+            self.search_field.text = ""
+            event.app.layout.focus(self.window)
+
+        kb.add("down")(self._next_match)
+        kb.add("c-n")(self._next_match)
+        kb.add("up")(self._previous_match)
+        kb.add("c-p")(self._previous_match)
+        return kb
+
+    def __pt_container__(self):
+        return self.container
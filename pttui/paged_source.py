@@ -0,0 +1,131 @@
+import asyncio
+import logging
+
+from prompt_toolkit.utils import Event
+
+from pttui.helpers import running_loop
+
+LOGGER = logging.getLogger(__name__)
+
+PAGE_SIZE = 100
+
+
+class _IteratorPages:
+    """Fetch pages from an async iterator.
+
+    The iterator is never cancelled half way an item: a cancelled fetch
+    leaves the pending item and the partial page for the next fetch.
+    """
+
+    def __init__(self, iterator, page_size):
+        self._iterator = iterator.__aiter__()
+        self._page_size = page_size
+        self._page = []
+        self._next = None
+        self._done = False
+
+    async def __call__(self, page):
+        while len(self._page) < self._page_size and not self._done:
+            if self._next is None:
+                self._next = asyncio.ensure_future(self._iterator.__anext__())
+            try:
+                self._page.append(await asyncio.shield(self._next))
+            except StopAsyncIteration:
+                self._done = True
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self._next = None
+                raise
+            self._next = None
+        page, self._page = self._page, []
+        return page
+
+
+class PagedSource:
+    """A list source which loads its items lazily, a page at a time.
+
+    Items are fetched with `fetch_page`, a coroutine function called with
+    the (zero based) page number which returns the items of that page. A
+    page with less than page_size items marks the end of the data.
+
+    Only the loaded items are part of the sequence. A VirtualList asks for
+    more items (see `touch`) when its cursor or view gets within prefetch
+    items of the end. Loaded items are kept, so the same source can be
+    shown again without fetching.
+
+    :param fetch_page: Coroutine function returning the items of a page.
+    :param page_size: The number of items per page.
+    :param prefetch: Load this many items ahead of the requested one.
+        Defaults to page_size.
+    """
+
+    def __init__(self, fetch_page, page_size=PAGE_SIZE, prefetch=None):
+        self._fetch_page = fetch_page
+        self.page_size = page_size
+        self.prefetch = page_size if prefetch is None else prefetch
+        self._items = []
+        self._wanted = 0
+        self._task = None
+        self.complete = False
+        self.on_change = Event(self)
+
+    @classmethod
+    def from_iterator(cls, iterator, page_size=PAGE_SIZE, prefetch=None):
+        """Create a source reading its items from an async iterator."""
+        return cls(_IteratorPages(iterator, page_size), page_size, prefetch)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, idx):
+        return self._items[idx]
+
+    @property
+    def loading(self):
+        task = self._task
+        # a task of another (or a closed) loop never finishes here.
+        return (
+            task is not None
+            and not task.done()
+            and task.get_loop() is running_loop()
+        )
+
+    def touch(self, idx):
+        """Load the items up to idx plus the prefetch margin.
+
+        Loading only starts from a running event loop, without one the
+        items are loaded on the first touch from the loop.
+        """
+        wanted = idx + 1 + self.prefetch
+        if self.complete or wanted <= len(self._items):
+            return
+        self._wanted = max(self._wanted, wanted)
+        loop = running_loop()
+        if loop is not None and not self.loading:
+            self._task = loop.create_task(self._load())
+
+    async def _load(self):
+        while not self.complete and len(self._items) < self._wanted:
+            page = len(self._items) // self.page_size
+            try:
+                items = await self._fetch_page(page)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # leave it to the next touch to try again.
+                LOGGER.exception("Fetching page %s failed.", page)
+                break
+            self._items.extend(items)
+            if len(items) < self.page_size:
+                self.complete = True
+            self.on_change.fire()
+        # fire once more to get rid of the loading indicator.
+        self.on_change.fire()
+
+    def close(self):
+        """Cancel a running fetch. Loaded items are kept."""
+        self._wanted = len(self._items)
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
@@ -1,94 +1,248 @@
 import asyncio
-import json
-from asyncio import CancelledError
+import threading
+import time
+import weakref
+from collections import deque
 from functools import wraps
-from logging import Handler
-from xml.parsers.expat import ExpatError
+from logging import Handler, NOTSET
 
-from pygments.lexers.data import JsonLexer
-from pygments.token import Token
+from pttui.animation import ticker
+from pttui.helpers import running_loop
+from pttui.json_printer import JsonRenderer
+from pttui.layout import channels, output
+from pttui.output_buffer import format_line
 
-from pttui.layout import output
 
+class WriteQueue:
+    """Collects printer output and applies it at most once per frame.
 
-def print_key_value_pair(key, value, scroll=True):
-    output.text += "\n<green>{:<15}</green><orange>{}</orange>".format(
-        key, value
+    All writes pending at the time of a flush are appended to the buffer in
+    one go, which results in a single invalidation of the output pane.
+    Without a running event loop writes are applied immediately.
+
+    Producers which can outpace the screen (see `pttui.stream_printer`)
+    check `pending_size` and await `wait_flushed` to slow down.
+    """
+
+    def __init__(self, buffer, fps=30):
+        self.buffer = buffer
+        self.fps = fps
+        self._pending = []
+        self._pending_writes = 0
+        self._pending_size = 0
+        self._scroll = False
+        self._handle = None
+        self._flushed = None
+        self._last_flush = 0.0
+        self.writes = 0
+        self.flushes = 0
+        self.coalesced = 0
+
+    def write(self, fragments, scroll=True):
+        self._pending.extend(fragments)
+        self._pending_writes += 1
+        for fragment in fragments:
+            self._pending_size += len(fragment[1])
+        self._scroll = self._scroll or scroll
+        self.writes += 1
+        self._schedule()
+
+    @property
+    def at_line_start(self):
+        """Whether the next write starts on a new line (the pending writes
+        included)."""
+        for fragment in reversed(self._pending):
+            if fragment[1]:
+                return fragment[1].endswith("\n")
+        return self.buffer.at_line_start
+
+    @property
+    def pending_size(self):
+        """Number of characters waiting to be written to the buffer."""
+        return self._pending_size
+
+    async def wait_flushed(self):
+        """Wait until the writes pending now are applied to the buffer."""
+        if not self._pending_writes:
+            return
+        if self._flushed is None:
+            self._flushed = running_loop().create_future()
+        # shielded, a cancelled waiter must not cancel the other waiters.
+        await asyncio.shield(self._flushed)
+
+    def _schedule(self):
+        if self._handle is not None:
+            return
+        loop = running_loop()
+        if not self.fps or loop is None:
+            self.flush()
+            return
+        delay = self._last_flush + 1.0 / self.fps - time.monotonic()
+        self._handle = loop.call_later(max(0.0, delay), self.flush)
+
+    def flush(self):
+        """Apply all pending writes to the buffer."""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if self._flushed is not None:
+            if not self._flushed.done():
+                self._flushed.set_result(None)
+            self._flushed = None
+        if not self._pending_writes:
+            return
+        fragments, self._pending = self._pending, []
+        self._pending_size = 0
+        scroll, self._scroll = self._scroll, False
+        self.coalesced += self._pending_writes - 1
+        self._pending_writes = 0
+        self.flushes += 1
+        self._last_flush = time.monotonic()
+
+        self.buffer.append_fragments(fragments)
+        if scroll:
+            self.buffer.scroll_to_end()
+
+
+write_queue = WriteQueue(output)
+_write_queues = {channels.default: write_queue}
+
+
+def get_write_queue(channel=None):
+    """Return the write queue of a channel, None is the default channel."""
+    if channel is None:
+        return write_queue
+    try:
+        return _write_queues[channel]
+    except KeyError:
+        queue = WriteQueue(channels.get(channel).buffer, write_queue.fps)
+        _write_queues[channel] = queue
+        return queue
+
+
+def set_fps(fps):
+    """Set the maximum number of output updates per second.
+
+    None or 0 applies every write immediately.
+    """
+    for queue in _write_queues.values():
+        queue.fps = fps
+
+
+def flush():
+    """Write all pending output to the output panes."""
+    for queue in _write_queues.values():
+        queue.flush()
+
+
+def _styled(tag, text):
+    """Return fragments for text wrapped in a (color) tag.
+
+    Only text which contains markup itself needs to be parsed.
+    """
+    text = str(text)
+    if "<" in text or "&" in text:
+        return format_line("<{0}>{1}</{0}>".format(tag, text))
+    return [("class:" + tag, text)]
+
+
+def _new_line(write_queue):
+    """Return the fragments ending the last line when it is not empty."""
+    return [] if write_queue.at_line_start else [("", "\n")]
+
+
+def print_key_value_pair(key, value, scroll=True, channel=None):
+    write_queue = get_write_queue(channel)
+    write_queue.write(
+        _new_line(write_queue)
+        + _styled("green", "{:<15}".format(key))
+        + _styled("orange", value)
+        + [("", "\n")],
+        scroll,
     )
-    if scroll:
-        output.cursor_position = len(output.text)
 
 
-def print_line(line, line_end=True, scroll=True):
-    _line_end = ""
+def print_line(line, line_end=True, scroll=True, channel=None):
+    fragments = _styled("orange", line)
     if line_end:
-        _line_end = "\n"
-    output.text += "<orange>{}</orange>{}".format(line, _line_end)
-    if scroll:
-        output.cursor_position = len(output.text)
-
-
-def print_dict(data: dict, scroll=True):
-    text = json.dumps(data, indent=4)
-
-    lex = JsonLexer()
-    tokens = lex.get_tokens(text)
-    out = []
-    for tok in tokens:
-        if tok[0] == Token.Text:
-            out.append(tok[1])
-        elif tok[0] == Token.Punctuation:
-            out.append(tok[1])
-        elif tok[0] == Token.Name.Tag:
-            out.append("<green>{}</green>".format(tok[1]))
-        elif tok[0] == Token.Literal.Number.Integer:
-            out.append("<orange>{}</orange>".format(tok[1]))
-        elif tok[0] == Token.Keyword.Constant:
-            out.append("<red>{}</red>".format(tok[1]))
-        elif tok[0] == Token.Literal.Number.Float:
-            out.append("<yellow>{}</yellow>".format(tok[1]))
-        else:
-            out.append(tok[1])
-
-    output.text += "\n{}".format("".join(out))
-
-    if scroll:
-        output.cursor_position = len(output.text)
+        fragments = fragments + [("", "\n")]
+    get_write_queue(channel).write(fragments, scroll)
 
 
-def print_waiting_done(action):
-    async def waiting():
-        print_line(action, line_end=False)
+def print_dict(
+    data: dict, scroll=True, max_depth=None, max_items=None, channel=None
+):
+    renderer = JsonRenderer(max_depth=max_depth, max_items=max_items)
+    write_queue = get_write_queue(channel)
+    write_queue.write(
+        _new_line(write_queue) + renderer.fragments(data) + [("", "\n")],
+        scroll,
+    )
 
-        try:
-            while True:
-                await asyncio.sleep(0.5)
-                print_line(".", line_end=False, scroll=False)
-        except CancelledError:
-            pass
 
-    task = asyncio.ensure_future(waiting())
+async def stream_dict(
+    data: dict,
+    scroll=True,
+    max_depth=None,
+    max_items=None,
+    chunk_lines=500,
+    channel=None,
+):
+    """Print data in chunks of lines, yielding to the event loop in between.
+
+    Use this for large payloads to keep the ui responsive while printing.
+    """
+    renderer = JsonRenderer(max_depth=max_depth, max_items=max_items)
+    write_queue = get_write_queue(channel)
+    chunk = _new_line(write_queue)
+    count = 0
+    for line in renderer.lines(data):
+        chunk.extend(line)
+        chunk.append(("", "\n"))
+        count += 1
+        if count == chunk_lines:
+            write_queue.write(chunk, scroll)
+            chunk = []
+            count = 0
+            await asyncio.sleep(0)
+    if chunk:
+        write_queue.write(chunk, scroll)
+
+
+def print_waiting_done(action):
+    """Show a spinner for action in the status bar.
+
+    Returns a coroutine function which removes the spinner and prints that
+    the action is done.
+    """
+    indicator = ticker.spinner(action).start()
 
     async def _finished():
-        print_line("done")
-        # todo: make the wile loop not infinite as it might hang indefinitely
-        task.cancel()
-        while not task.cancelled:
-            await asyncio.sleep(0.5)
+        indicator.stop()
+        print_line("{} done".format(action))
 
     return _finished
 
 
 def spinner(message):
-    """Wraps a Waiting.... done spinner around a method"""
+    """Wraps a Waiting.... done spinner around a method.
+
+    "done" is only printed when the method succeeds, a cancelled method
+    prints "cancelled" and a failing one nothing (its exception is
+    raised).
+    """
 
     def _spinner(func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            done = print_waiting_done(message)
-            res = await func(*args, **kwargs)
-            await done()
-            return res
+            try:
+                with ticker.spinner(message):
+                    result = await func(*args, **kwargs)
+            except asyncio.CancelledError:
+                print_line("{} cancelled".format(message))
+                raise
+            print_line("{} done".format(message))
+            return result
 
         return wrapper
 
@@ -96,9 +250,193 @@ def spinner(message):
 
 
 class LogHandler(Handler):
+    """Writes log records to the output.
+
+    :param channel: Write all records to this channel. By default records
+        go to the channel they are routed to (see `Channels.add_route`).
+    """
+
+    def __init__(self, level=NOTSET, channel=None):
+        super().__init__(level)
+        self.channel = channel
+
     def emit(self, record):
-        msg = self.format(record)
+        channel = self.channel or channels.channel_for(record)
+        write_queue = get_write_queue(channel)
+        # log messages are plain text, they are not parsed as markup.
+        write_queue.write(
+            _new_line(write_queue)
+            + [("class:orange", self.format(record) + "\n")]
+        )
+
+
+DROP_NEWEST = "drop_newest"
+DROP_OLDEST = "drop_oldest"
+SAMPLE = "sample"
+
+
+class QueueLogHandler(Handler):
+    """Log handler which can safely be used from any thread.
+
+    Records are formatted in the logging thread and put on a bounded queue.
+    The UI event loop takes them off the queue in batches, every batch
+    results in a single write to the output pane.
+
+    When the queue is full the overload policy decides what happens:
+    DROP_NEWEST drops the incoming record, DROP_OLDEST drops the oldest
+    queued record and SAMPLE only keeps one out of every `sample_rate`
+    incoming records (replacing the oldest one).
+
+    Records go to the channel they are routed to (see
+    `Channels.add_route`), or all to `channel` when it is given. A batch
+    results in a single write per channel.
+
+    Other threads can not look up the ui loop, records logged from them
+    are delivered once the handler is bound to the loop. `get_layout`
+    binds all handlers to the running loop (see `attach_log_handlers`),
+    pass `loop` or call `attach` when the layout is built elsewhere.
+    """
+
+    def __init__(
+        self,
+        level=NOTSET,
+        max_queued=10000,
+        overload_policy=DROP_OLDEST,
+        sample_rate=10,
+        batch_size=1000,
+        loop=None,
+        channel=None,
+    ):
+        assert overload_policy in (DROP_NEWEST, DROP_OLDEST, SAMPLE)
+        super().__init__(level)
+        self.max_queued = max_queued
+        self.overload_policy = overload_policy
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.loop = loop or running_loop()
+        self.channel = channel
+        self._records = deque()
+        self._drain_scheduled = False
+        self._sample_count = 0
+        self.dropped = 0
+        self.handled = 0
+        _queue_log_handlers.add(self)
+
+    @property
+    def queued(self):
+        return len(self._records)
+
+    def attach(self, loop=None):
+        """Bind the handler to the ui loop, by default the running loop.
+
+        Records queued before are written from that loop.
+        """
+        self.acquire()
+        try:
+            self.loop = loop or running_loop()
+            self._drain_scheduled = False
+            self._schedule_drain()
+        finally:
+            self.release()
+
+    def _get_loop(self):
+        if self.loop is not None and self.loop.is_closed():
+            # a drain scheduled on the closed loop never runs.
+            self.loop = None
+            self._drain_scheduled = False
+        if self.loop is None:
+            # The ui loop can only be looked up from the thread running it.
+            self.loop = running_loop()
+        return self.loop
+
+    def _schedule_drain(self):
+        # Called with self.lock held.
+        loop = self._get_loop()
+        if self._drain_scheduled or not self._records:
+            return
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self.drain)
+            except RuntimeError:
+                # the loop was closed in the meantime.
+                self.loop = None
+            else:
+                self._drain_scheduled = True
+                return
+        if threading.current_thread() is threading.main_thread():
+            # No ui loop is running (yet), write the records directly.
+            self.drain()
+        # Otherwise the records stay queued until the handler is bound to
+        # the ui loop.
+
+    def _enqueue(self, msg):
+        if len(self._records) < self.max_queued:
+            self._records.append(msg)
+            return
+        if self.overload_policy == SAMPLE:
+            self._sample_count += 1
+            if self._sample_count % self.sample_rate:
+                self.dropped += 1
+                return
+        elif self.overload_policy == DROP_NEWEST:
+            self.dropped += 1
+            return
+        self._records.popleft()
+        self._records.append(msg)
+        self.dropped += 1
+
+    def emit(self, record):
+        # Handler.handle holds self.lock while calling emit.
         try:
-            print_line(msg)
-        except ExpatError:
-            pass
+            channel = self.channel or channels.channel_for(record)
+            self._enqueue((channel, self.format(record)))
+        except Exception:
+            self.handleError(record)
+            return
+        self._schedule_drain()
+
+    def drain(self):
+        """Write a batch of queued records to the output pane.
+
+        Must be called from the ui event loop. Schedules itself again when
+        more records are waiting, so key handling is not starved.
+        """
+        self.acquire()
+        try:
+            count = min(self.batch_size, len(self._records))
+            batch = [self._records.popleft() for _ in range(count)]
+            more = bool(self._records)
+            self._drain_scheduled = more
+        finally:
+            self.release()
+
+        if batch:
+            self.handled += len(batch)
+            by_channel = {}
+            for channel, msg in batch:
+                by_channel.setdefault(channel, []).append(msg)
+            for channel, msgs in by_channel.items():
+                write_queue = get_write_queue(channel)
+                write_queue.write(
+                    _new_line(write_queue)
+                    + [("class:orange", "\n".join(msgs) + "\n")]
+                )
+        if more:
+            loop = self._get_loop()
+            if loop is None:
+                self.drain()
+            else:
+                loop.call_soon(self.drain)
+
+
+_queue_log_handlers = weakref.WeakSet()
+
+
+def attach_log_handlers(loop=None):
+    """Bind all QueueLogHandlers to the ui loop, by default the running
+    loop."""
+    loop = loop or running_loop()
+    if loop is None:
+        return
+    for handler in list(_queue_log_handlers):
+        handler.attach(loop)
@@ -0,0 +1,213 @@
+import time
+
+from prompt_toolkit.formatted_text import (
+    fragment_list_to_text,
+    fragment_list_width,
+)
+from prompt_toolkit.layout import UIContent, UIControl
+from prompt_toolkit.layout.utils import explode_text_fragments
+from prompt_toolkit.utils import Event, get_cwidth
+
+from pttui.helpers import running_loop
+from pttui.output_buffer import format_line
+
+SEPARATOR = [("", " | ")]
+
+
+class StatusSegment:
+    """A named part of the status bar.
+
+    The value is parsed once when it is set, rendering only concatenates
+    the fragments of the segments.
+    """
+
+    __slots__ = (
+        "name",
+        "fragments",
+        "width",
+        "priority",
+        "order",
+        "min_interval",
+        "updated",
+        "pending",
+        "handle",
+    )
+
+    def __init__(self, name, priority, order, min_interval):
+        self.name = name
+        self.fragments = []
+        self.width = 0
+        self.priority = priority
+        self.order = order
+        self.min_interval = min_interval
+        self.updated = None
+        self.pending = None
+        self.handle = None
+
+    def set_value(self, value):
+        """Set the value, html markup or a list of fragments."""
+        if isinstance(value, str):
+            value = format_line(value)
+        self.fragments = value
+        self.width = fragment_list_width(value)
+
+    @property
+    def text(self):
+        return fragment_list_to_text(self.fragments)
+
+
+def _truncate(fragments, width):
+    """Cut fragments to width columns."""
+    result = []
+    for fragment in explode_text_fragments(fragments):
+        width -= get_cwidth(fragment[1])
+        if width < 0:
+            break
+        result.append(fragment)
+    return result
+
+
+class StatusBar:
+    """The segments shown in the status bar.
+
+    Segments are shown in order (the order they were added in, unless an
+    order is given). When they do not fit the width, the segments with the
+    lowest priority are left out and the remaining line is cut off. The
+    rendered line is cached until a segment changes or the width does.
+
+    A segment with a min_interval is updated at most once per min_interval
+    seconds, the last value set within the interval is shown when it ends.
+    """
+
+    def __init__(self):
+        self._segments = {}
+        self._count = 0
+        self._line = None
+        self._width = None
+        self.on_change = Event(self)
+
+    def __contains__(self, name):
+        return name in self._segments
+
+    def set(self, name, value, priority=None, order=None, min_interval=None):
+        """Set the value of a segment, adding the segment if needed.
+
+        :param value: Html markup or a list of formatted text fragments.
+        :param priority: Segments with a higher priority are kept when the
+            status bar is too narrow. Defaults to 0.
+        :param order: Segments are shown by ascending order.
+        :param min_interval: Minimum number of seconds between updates.
+        """
+        segment = self._segments.get(name)
+        if segment is None:
+            self._count += 1
+            segment = StatusSegment(
+                name,
+                0 if priority is None else priority,
+                self._count if order is None else order,
+                min_interval,
+            )
+            self._segments[name] = segment
+        else:
+            if priority is not None:
+                segment.priority = priority
+            if order is not None:
+                segment.order = order
+            if min_interval is not None:
+                segment.min_interval = min_interval
+
+        if segment.min_interval and segment.updated is not None:
+            loop = running_loop()
+            remaining = segment.updated + segment.min_interval
+            remaining -= time.monotonic()
+            if remaining > 0 and loop is not None:
+                segment.pending = value
+                if segment.handle is None:
+                    segment.handle = loop.call_later(
+                        remaining, self._apply_pending, segment
+                    )
+                return
+        self._apply(segment, value)
+
+    def _apply(self, segment, value):
+        segment.set_value(value)
+        segment.updated = time.monotonic()
+        self._changed()
+
+    def _apply_pending(self, segment):
+        segment.handle = None
+        if self._segments.get(segment.name) is segment:
+            self._apply(segment, segment.pending)
+        segment.pending = None
+
+    def remove(self, name):
+        segment = self._segments.pop(name, None)
+        if segment is not None:
+            if segment.handle is not None:
+                segment.handle.cancel()
+            self._changed()
+
+    def _changed(self):
+        self._line = None
+        self.on_change.fire()
+
+    @property
+    def text(self):
+        """The plain text of all segments."""
+        return fragment_list_to_text(self._render(self._sorted()))
+
+    def _sorted(self):
+        return sorted(self._segments.values(), key=lambda seg: seg.order)
+
+    @staticmethod
+    def _render(segments):
+        line = []
+        for segment in segments:
+            if line:
+                line.extend(SEPARATOR)
+            line.extend(segment.fragments)
+        return line
+
+    def get_fragments(self, width):
+        """Return the status line for width columns."""
+        if self._line is not None and width == self._width:
+            return self._line
+
+        segments = self._sorted()
+        separator = fragment_list_width(SEPARATOR)
+        total = sum(seg.width for seg in segments)
+        total += separator * max(0, len(segments) - 1)
+        by_priority = sorted(segments, key=lambda seg: seg.priority)
+        while total > width and len(segments) > 1:
+            dropped = by_priority.pop(0)
+            segments.remove(dropped)
+            total -= dropped.width + separator
+
+        line = self._render(segments)
+        if total > width:
+            line = _truncate(line, width)
+        self._line = line
+        self._width = width
+        return line
+
+
+class StatusBarControl(UIControl):
+    """Shows a StatusBar on a single line."""
+
+    def __init__(self, status_bar, style=""):
+        self.status_bar = status_bar
+        self.style = style
+
+    def create_content(self, width, height):
+        fragments = self.status_bar.get_fragments(width)
+        if self.style:
+            fragments = [
+                (self.style + " " + fragment[0],) + tuple(fragment[1:])
+                for fragment in fragments
+            ]
+        return UIContent(
+            get_line=lambda idx: fragments, line_count=1, show_cursor=False
+        )
+
+    def get_invalidate_events(self):
+        yield self.status_bar.on_change
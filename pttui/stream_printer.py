@@ -0,0 +1,223 @@
+import asyncio
+import codecs
+import io
+import os
+from asyncio.subprocess import PIPE
+
+from pttui.async_widgets import run_in_executor
+from pttui.printers import get_write_queue
+
+# Number of bytes read from a pipe or file at once.
+READ_SIZE = 64 * 1024
+# Number of characters a stream may have waiting in the write queue before
+# it stops reading until the output pane has caught up.
+MAX_PENDING = 256 * 1024
+
+STDERR_STYLE = "class:red"
+
+
+class StreamPrinter:
+    """Writes a stream of text or bytes to the output pane.
+
+    Data is written in the chunks it arrives in, a chunk results in one
+    write however many lines it contains. Line endings are normalized
+    (\\r\\n and \\r become \\n) and bytes are decoded incrementally, so a
+    character or line ending split over two chunks is handled.
+
+    Only complete lines are written, the last incomplete line is kept until
+    its line end arrives (or `READ_SIZE` characters are waiting), so streams
+    sharing a channel do not end up on each other's lines. Output starts on
+    a new line when the last line of the channel is not empty, and `close`
+    ends the last line.
+
+    `write` waits when more than `max_pending` characters are waiting to
+    be shown. A producer awaiting it is slowed down to the speed of the
+    output pane instead of filling the memory.
+    """
+
+    def __init__(
+        self,
+        style="",
+        channel=None,
+        scroll=True,
+        encoding="utf-8",
+        max_pending=MAX_PENDING,
+    ):
+        self.style = style
+        self.scroll = scroll
+        self.max_pending = max_pending
+        self.encoding = encoding
+        self.write_queue = get_write_queue(channel)
+        self._decoder = None
+        self._tail = ""
+        # the last line written is an incomplete line of this stream.
+        self._open = False
+        self.characters = 0
+
+    async def write(self, data):
+        """Write a chunk of str or bytes (a stream is one or the other)."""
+        self._write(data, final=False)
+        if self.write_queue.pending_size > self.max_pending:
+            await self.write_queue.wait_flushed()
+
+    def close(self):
+        """Write what is left of the last line and end it."""
+        if self._decoder is not None:
+            self._write(b"" if self._bytes else "", final=True)
+        if self._tail or self._open:
+            self._append(self._tail + "\n")
+            self._tail = ""
+
+    def _write(self, data, final=False):
+        if self._decoder is None:
+            self._bytes = isinstance(data, bytes)
+            self._decoder = io.IncrementalNewlineDecoder(
+                codecs.getincrementaldecoder(self.encoding)(errors="replace")
+                if self._bytes
+                else None,
+                translate=True,
+            )
+        text = self._decoder.decode(data, final)
+        if not text:
+            return
+        text = self._tail + text
+        end = text.rfind("\n") + 1
+        if end == 0 and len(text) < READ_SIZE:
+            self._tail = text
+            return
+        if end == 0:
+            end = len(text)
+        self._tail = text[end:]
+        self._append(text[:end])
+
+    def _append(self, text):
+        self.characters += len(text)
+        fragments = [(self.style, text)]
+        if not self._open and not self.write_queue.at_line_start:
+            fragments.insert(0, ("", "\n"))
+        self._open = not text.endswith("\n")
+        self.write_queue.write(fragments, self.scroll)
+
+
+async def _read_chunks(reader, printer):
+    while True:
+        data = await reader.read(READ_SIZE)
+        if not data:
+            return
+        await printer.write(data)
+
+
+async def _read_fd(fd, printer):
+    loop = asyncio.get_running_loop()
+    pipe = os.fdopen(fd, "rb", closefd=False)
+    reader = asyncio.StreamReader(limit=READ_SIZE)
+    try:
+        transport, _ = await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader), pipe
+        )
+    except ValueError:
+        # regular files are not supported by the pipe transport, they
+        # are read in a thread (reading a file does not block for long).
+        pipe.close()
+        while True:
+            data = await run_in_executor(os.read, fd, READ_SIZE)
+            if not data:
+                return
+            await printer.write(data)
+    try:
+        await _read_chunks(reader, printer)
+    finally:
+        transport.close()
+
+
+async def stream(
+    source,
+    style="",
+    channel=None,
+    scroll=True,
+    encoding="utf-8",
+    max_pending=MAX_PENDING,
+    lines=False,
+):
+    """Print everything from source to the output pane until it ends.
+
+    :param source: An async iterator of str or bytes chunks, an
+        asyncio.StreamReader, a file descriptor or a file object with a
+        file descriptor (a pipe, tty or regular file). File descriptors
+        are not closed.
+    :param lines: The async iterator yields lines without line endings,
+        every item is printed on a line of its own. Without it the items
+        are written as they are, only line endings in them start a new
+        line.
+
+    Pipes and readers are read in chunks of `READ_SIZE` bytes. Reading
+    stops while the output pane is behind (see `StreamPrinter`), for a pipe
+    that makes the writing end wait as well. Cancel the task running it to
+    stop streaming, the output read so far stays in the pane. Returns the
+    number of characters written.
+    """
+    printer = StreamPrinter(style, channel, scroll, encoding, max_pending)
+    try:
+        if isinstance(source, asyncio.StreamReader):
+            await _read_chunks(source, printer)
+        elif hasattr(source, "__aiter__"):
+            async for data in source:
+                if lines:
+                    data += b"\n" if isinstance(data, bytes) else "\n"
+                await printer.write(data)
+        else:
+            if not isinstance(source, int):
+                source = source.fileno()
+            await _read_fd(source, printer)
+    finally:
+        printer.close()
+    return printer.characters
+
+
+async def _stop_process(process, timeout):
+    if process.returncode is not None:
+        return
+    try:
+        process.terminate()
+        try:
+            await asyncio.wait_for(process.wait(), timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+    except ProcessLookupError:
+        pass
+
+
+async def stream_process(
+    *cmd,
+    channel=None,
+    stderr_style=STDERR_STYLE,
+    kill_timeout=3,
+    max_pending=MAX_PENDING,
+    **kwargs
+):
+    """Run a command and print its stdout and stderr until it exits.
+
+    stderr is printed in `stderr_style`. Other keyword arguments are
+    passed to `asyncio.create_subprocess_exec` (cwd, env, ...). When
+    cancelled the process is terminated, and killed when it has not exited
+    after `kill_timeout` seconds. Returns the exit code of the process.
+    """
+    process = await asyncio.create_subprocess_exec(
+        *cmd, stdout=PIPE, stderr=PIPE, **kwargs
+    )
+    try:
+        await asyncio.gather(
+            stream(
+                process.stdout, channel=channel, max_pending=max_pending
+            ),
+            stream(
+                process.stderr,
+                stderr_style,
+                channel=channel,
+                max_pending=max_pending,
+            ),
+        )
+        return await process.wait()
+    finally:
+        await _stop_process(process, kill_timeout)
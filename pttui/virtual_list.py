@@ -0,0 +1,196 @@
+from prompt_toolkit.application import get_app
+from prompt_toolkit.data_structures import Point
+from prompt_toolkit.filters import Condition
+from prompt_toolkit.key_binding import KeyBindings
+from prompt_toolkit.layout import UIContent, UIControl, Window
+from prompt_toolkit.mouse_events import MouseEventType
+
+from pttui.async_widgets import supervisor
+
+
+def get_item_text(item):
+    return item["text"]
+
+
+class IndexedView:
+    """A read-only view on the items of a source at the given indexes."""
+
+    def __init__(self, source, indexes):
+        self.source = source
+        self.indexes = indexes
+
+    def __len__(self):
+        return len(self.indexes)
+
+    def __getitem__(self, idx):
+        return self.source[self.indexes[idx]]
+
+
+class VirtualListControl(UIControl):
+    """A selectable list which only renders the visible rows.
+
+    The rows come from a data source which only needs to support `len` and
+    indexing, so building the list does not depend on its length. A lazily
+    loaded source (see PagedSource) is asked for more items when the view
+    gets near its end.
+
+    :param source: The data source, for example a list of dicts.
+    :param on_select: Coroutine function called with the selected item.
+    :param get_text: Returns the text to display for an item.
+    """
+
+    def __init__(self, source, on_select=None, get_text=get_item_text):
+        self.source = source
+        self.on_select = on_select
+        self.get_text = get_text
+        self.cursor = 0
+        self._key_bindings = self._make_key_bindings()
+
+    @property
+    def current_item(self):
+        if not len(self.source):
+            return None
+        return self.source[self.cursor]
+
+    def set_source(self, source):
+        self.source = source
+        self.cursor = 0
+        self._touch(0)
+        get_app().invalidate()
+
+    def move_cursor(self, idx):
+        self.cursor = max(0, min(idx, len(self.source) - 1))
+        self._touch(self.cursor)
+
+    def _touch(self, idx):
+        touch = getattr(self.source, "touch", None)
+        if touch is not None:
+            touch(idx)
+
+    def _line_count(self):
+        count = len(self.source)
+        if getattr(self.source, "loading", False):
+            # a row for the loading indicator.
+            count += 1
+        return count
+
+    def select(self, idx=None):
+        """Call on_select with the item at idx or at the cursor."""
+        if idx is not None:
+            self.move_cursor(idx)
+        item = self.current_item
+        if item is not None and self.on_select:
+            supervisor.run(self.on_select, item)
+
+    def is_focusable(self):
+        return True
+
+    def preferred_height(
+        self, width, max_available_height, wrap_lines, get_line_prefix=None
+    ):
+        # An empty list gets no height and is never asked for its content,
+        # loading starts here, when the list is rendered for the first time.
+        self._touch(self.cursor)
+        return min(self._line_count(), max_available_height)
+
+    def create_content(self, width, height):
+        source = self.source
+        focused = get_app().layout.current_control is self
+        cursor = self.cursor
+        count = len(source)
+        self._touch(cursor + height)
+
+        def get_line(idx):
+            if idx == count:
+                return [("class:button.text", "  loading...")]
+            style = "class:button"
+            if focused and idx == cursor:
+                style = "class:button.focused"
+            text = "  -{}".format(self.get_text(source[idx]))
+            return [(style + " class:button.text", text)]
+
+        return UIContent(
+            get_line=get_line,
+            line_count=self._line_count(),
+            cursor_position=Point(x=0, y=cursor),
+            show_cursor=False,
+        )
+
+    def get_invalidate_events(self):
+        on_change = getattr(self.source, "on_change", None)
+        if on_change is not None:
+            yield on_change
+
+    def mouse_handler(self, mouse_event):
+        if mouse_event.event_type == MouseEventType.MOUSE_UP:
+            get_app().layout.current_control = self
+            # the row after the items is the loading indicator.
+            if mouse_event.position.y < len(self.source):
+                self.select(mouse_event.position.y)
+            return None
+        return NotImplemented
+
+    def move_cursor_down(self):
+        self.move_cursor(self.cursor + 1)
+
+    def move_cursor_up(self):
+        self.move_cursor(self.cursor - 1)
+
+    def _page_size(self, event):
+        info = event.app.layout.current_window.render_info
+        if info is None:
+            return 1
+        return max(1, info.window_height - 1)
+
+    def _make_key_bindings(self):
+        kb = KeyBindings()
+
+        # At the first and last row up and down are left to the container
+        # (the sidebar moves the focus to the previous or next item).
+        @kb.add("up", filter=Condition(lambda: self.cursor > 0))
+        def _(event):
+            self.move_cursor_up()
+
+        @kb.add(
+            "down",
+            filter=Condition(lambda: self.cursor < len(self.source) - 1),
+        )
+        def _(event):
+            self.move_cursor_down()
+
+        @kb.add("pageup")
+        def _(event):
+            self.move_cursor(self.cursor - self._page_size(event))
+
+        @kb.add("pagedown")
+        def _(event):
+            self.move_cursor(self.cursor + self._page_size(event))
+
+        @kb.add("home")
+        def _(event):
+            self.move_cursor(0)
+
+        @kb.add("end")
+        def _(event):
+            self.move_cursor(len(self.source) - 1)
+
+        @kb.add(" ")
+        @kb.add("enter")
+        def _(event):
+            self.select()
+
+        return kb
+
+    def get_key_bindings(self):
+        return self._key_bindings
+
+
+class VirtualList:
+    """Container for a VirtualListControl."""
+
+    def __init__(self, source, on_select=None, get_text=get_item_text):
+        self.control = VirtualListControl(source, on_select, get_text)
+        self.window = Window(self.control)
+
+    def __pt_container__(self):
+        return self.window
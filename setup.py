@@ -7,7 +7,9 @@ setup(
     url="",
     license="MIT",
     author="sander",
-    install_requires=["prompt-toolkit==2.0.7"],
+    install_requires=["prompt-toolkit>=3.0"],
+    extras_require={"uvloop": ["uvloop"]},
+    python_requires=">=3.7",
     author_email="",
     description="Prompt toolkit fullscreen implementation for easy prototyping",
 )